@@ -1,5 +1,6 @@
 import os
-from typing import TypedDict, Annotated, List, Union, Literal
+import json
+from typing import TypedDict, List
 from langgraph.graph import StateGraph, END
 from google import genai
 from google.genai import types
@@ -9,145 +10,158 @@ class AgentState(TypedDict):
     messages: List[str]
     current_draft: str
     critique_count: int
+    next: str
 
 # Initialize the Google GenAI Client
 # Assumes GOOGLE_API_KEY is set in environment variables
 client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
 
-def supervisor_node(state: AgentState) -> dict:
-    """
-    The Supervisor node decides the next step based on the current state.
-    It uses Gemini 3 Pro to make the decision.
-    """
-    messages = state.get("messages", [])
-    current_draft = state.get("current_draft", "")
-    critique_count = state.get("critique_count", 0)
-
-    prompt = f"""
-    You are a supervisor managing a writing process.
-    Current Draft: {current_draft}
-    Critique Count: {critique_count}
-    Messages: {messages}
+# Supervisor decision -> graph node
+NEXT_NODE = {"Writer": "writer", "Editor": "editor", "FINISH": "end"}
 
-    Decide the next step:
+SUPERVISOR_RULES = """
+    After finishing your task, decide the next step:
     - If there is no draft, call 'Writer'.
     - If there is a draft and critique_count < 3, call 'Editor'.
     - If the draft is good enough or critique_count >= 3, call 'FINISH'.
 
-    Respond with ONLY one word: 'Writer', 'Editor', or 'FINISH'.
+    Respond with ONLY a JSON object, with your draft or critique in "payload":
+    {"next": "Writer" | "Editor" | "FINISH", "payload": "<your output>"}
     """
 
+
+def decide_next(current_draft: str, critique_count: int) -> str:
+    """
+    Deterministic routing rule for the Writer/Editor/FINISH state machine.
+    The decision only depends on (bool(current_draft), critique_count), so it
+    is resolved locally instead of spending a Gemini call on it.
+    """
+    if not current_draft:
+        return "Writer"
+    elif critique_count < 3:
+        return "Editor"
+    return "FINISH"
+
+
+def run_step(prompt: str) -> tuple[str | None, str]:
+    """
+    Runs a worker step. When SUPERVISOR_LLM is set, the supervisor decision is
+    requested in the same Gemini call as a JSON envelope {next, payload}.
+    Returns: (next_step or None if the local rule should decide, payload)
+    """
+    if not os.environ.get("SUPERVISOR_LLM"):
+        response = client.models.generate_content(
+            model="gemini-2.5-flash",
+            contents=prompt
+        )
+        return None, response.text
+
     response = client.models.generate_content(
         model="gemini-2.5-flash",
-        contents=prompt,
+        contents=prompt + SUPERVISOR_RULES,
         config=types.GenerateContentConfig(
-            temperature=0.0
+            response_mime_type="application/json"
         )
-    )|
-    
-    decision = response.text.strip()
-    
+    )
+
+    try:
+        result = json.loads(response.text)
+        decision = str(result.get("next", "")).strip()
+        payload = str(result.get("payload", ""))
+    except (ValueError, AttributeError):
+        # Model ignored the envelope; treat the whole response as the payload
+        decision = ""
+        payload = response.text
+
     # Fallback/Safety in case of unexpected output
-    if decision not in ["Writer", "Editor", "FINISH"]:
-        # Simple logic fallback
-        if not current_draft:
-            decision = "Writer"
-        elif critique_count < 3:
-            decision = "Editor"
-        else:
-            decision = "FINISH"
+    if decision not in NEXT_NODE:
+        decision = None
 
-    return {"messages": messages + [f"Supervisor decided: {decision}"]}
+    return decision, payload
 
 def writer_node(state: AgentState) -> dict:
     """
-    The Writer node generates or revises the draft.
+    The Writer node generates or revises the draft and picks the next step.
     """
     messages = state.get("messages", [])
     current_draft = state.get("current_draft", "")
-    
+    critique_count = state.get("critique_count", 0)
+
     prompt = f"""
     You are a writer.
     Current Draft: {current_draft}
     Feedback/Messages: {messages}
-    
+
     Write or revise the draft based on the feedback.
+    Critique Count: {critique_count}
     """
-    
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
-    )
-    
-    new_draft = response.text
-    return {"current_draft": new_draft, "messages": messages + ["Writer updated draft."]}
+
+    decision, payload = run_step(prompt)
+    new_draft = payload or current_draft
+    if decision is None or (decision == "Writer" and new_draft):
+        # Writing again right away would loop without feedback
+        decision = decide_next(new_draft, critique_count)
+
+    return {
+        "current_draft": new_draft,
+        "messages": messages + ["Writer updated draft.", f"Supervisor decided: {decision}"],
+        "next": decision,
+    }
 
 def editor_node(state: AgentState) -> dict:
     """
-    The Editor node critiques the draft.
+    The Editor node critiques the draft and picks the next step.
     """
     current_draft = state.get("current_draft", "")
-    critique_count = state.get("critique_count", 0)
-    
+    critique_count = state.get("critique_count", 0) + 1
+
     prompt = f"""
     You are an editor.
     Current Draft: {current_draft}
-    
+
     Provide a brief critique of the draft.
+    Critique Count: {critique_count}
     """
-    
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
-    )
-    
-    critique = response.text
+
+    decision, critique = run_step(prompt)
+    if decision is None:
+        decision = decide_next(current_draft, critique_count)
+
     return {
-        "messages": state.get("messages", []) + [f"Editor critique: {critique}"],
-        "critique_count": critique_count + 1
+        "messages": state.get("messages", []) + [
+            f"Editor critique: {critique}",
+            f"Supervisor decided: {decision}",
+        ],
+        "critique_count": critique_count,
+        "next": decision,
     }
 
 def get_next_step(state: AgentState) -> str:
     """
-    Determines the next edge based on the supervisor's decision in the messages.
-    Note: In a real supervisor pattern, the supervisor output itself usually drives the edge.
-    Here we parse the last message for simplicity or re-run logic.
-    However, the prompt asked for the Supervisor to *decide*.
-    
-    To make this work with LangGraph's conditional edges, we need to extract the decision.
-    Let's adjust the supervisor to output a specific key or parse the last message.
+    Routes directly off the decision stored in state["next"].
+    The entry call has no decision yet, so it uses the local routing rule.
     """
-    last_message = state["messages"][-1]
-    if "Supervisor decided: Writer" in last_message:
-        return "writer"
-    elif "Supervisor decided: Editor" in last_message:
-        return "editor"
-    elif "Supervisor decided: FINISH" in last_message:
-        return "end"
-    return "end"
+    decision = state.get("next") or decide_next(
+        state.get("current_draft", ""), state.get("critique_count", 0)
+    )
+    return NEXT_NODE.get(decision, "end")
 
 # Build the Graph
 workflow = StateGraph(AgentState)
 
-workflow.add_node("supervisor", supervisor_node)
 workflow.add_node("writer", writer_node)
 workflow.add_node("editor", editor_node)
 
 # Define edges
-workflow.set_entry_point("supervisor")
-
-workflow.add_conditional_edges(
-    "supervisor",
-    get_next_step,
-    {
-        "writer": "writer",
-        "editor": "editor",
-        "end": END
-    }
-)
-
-workflow.add_edge("writer", "supervisor")
-workflow.add_edge("editor", "supervisor")
+# Each worker decides its own successor, so there is no separate supervisor hop.
+routes = {
+    "writer": "writer",
+    "editor": "editor",
+    "end": END
+}
+workflow.set_conditional_entry_point(get_next_step, routes)
+workflow.add_conditional_edges("writer", get_next_step, routes)
+workflow.add_conditional_edges("editor", get_next_step, routes)
 
 # Compile the graph
 app = workflow.compile()
@@ -157,9 +171,10 @@ if __name__ == "__main__":
     initial_state = {
         "messages": ["Start the process. Topic: The future of AI."],
         "current_draft": "",
-        "critique_count": 0
+        "critique_count": 0,
+        "next": "",
     }
-    
+
     print("Starting workflow...")
     # Iterate through the graph steps
     for output in app.stream(initial_state):
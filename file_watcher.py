@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 import re
 import shutil
@@ -14,10 +15,21 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
+# inotify reports IN_CLOSE_WRITE (watchdog's on_closed) once the writer is done,
+# so on Linux we don't need to sleep and guess when the write has finished.
+CLOSE_EVENTS_SUPPORTED = sys.platform.startswith("linux")
+
+# Filename sanitization patterns (compiled once; used on every event)
+_SANITIZE = re.compile(r'[^\w\s-]')
+_WS = re.compile(r'\s+')
+
 class MarkdownHandler(FileSystemEventHandler):
     def __init__(self, output_dir, vault_sync_dir):
         self.output_dir = output_dir
         self.vault_sync_dir = vault_sync_dir
+        self.pending_paths = set()
+        # Ensure destination directory exists once, not on every file event
+        os.makedirs(self.vault_sync_dir, exist_ok=True)
 
     def on_created(self, event):
         if event.is_directory:
@@ -27,11 +39,25 @@ class MarkdownHandler(FileSystemEventHandler):
         if not filename.endswith('.md'):
             return
 
+        if CLOSE_EVENTS_SUPPORTED:
+            # Process once the writer closes the file (see on_closed)
+            self.pending_paths.add(event.src_path)
+            return
+
         # Wait a brief moment to ensure file write is complete
         time.sleep(0.5)
-        
+        self._handle(event.src_path, filename)
+
+    def on_closed(self, event):
+        if event.is_directory or event.src_path not in self.pending_paths:
+            return
+
+        self.pending_paths.discard(event.src_path)
+        self._handle(event.src_path, os.path.basename(event.src_path))
+
+    def _handle(self, file_path, filename):
         try:
-            self.process_file(event.src_path, filename)
+            self.process_file(file_path, filename)
         except Exception as e:
             logging.error(f"Error processing file {filename}: {e}")
 
@@ -39,9 +65,9 @@ class MarkdownHandler(FileSystemEventHandler):
         # Remove extension for sanitization
         name, ext = os.path.splitext(filename)
         # Remove illegal characters (keep alphanumeric, spaces, hyphens, underscores)
-        sanitized_name = re.sub(r'[^\w\s-]', '', name)
+        sanitized_name = _SANITIZE.sub('', name)
         # Strip whitespace and replace multiple spaces with single space
-        sanitized_name = re.sub(r'\s+', ' ', sanitized_name).strip()
+        sanitized_name = _WS.sub(' ', sanitized_name).strip()
         return f"{sanitized_name}{ext}"
 
     def process_file(self, file_path, original_filename):
@@ -73,9 +99,6 @@ status: "AI Generated"
         
         dest_path = os.path.join(self.vault_sync_dir, sanitized_filename)
         
-        # Ensure destination directory exists (script attempts to create it if possible)
-        os.makedirs(self.vault_sync_dir, exist_ok=True)
-
         with open(dest_path, 'w', encoding='utf-8') as f:
             f.write(new_content)
             
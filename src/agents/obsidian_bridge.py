@@ -1,36 +1,96 @@
 import os
+import sys
 import time
 import re
+import json
+import hashlib
+import asyncio
 import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from src.core.cognitive_engine import CognitiveEngine
+from src.core.consistency_controller import ConsistencyController
 from src.utils.entity_registry import EntityRegistry
+from src.utils.coalescer import Coalescer
 import markdown
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
+# inotify reports IN_CLOSE_WRITE (watchdog's on_closed) once the writer is done,
+# so on Linux we don't need to sleep and guess when the write has finished.
+CLOSE_EVENTS_SUPPORTED = sys.platform.startswith("linux")
+
+# Verdict words that fail the Blind Visual check
+_FAIL_RE = re.compile(r"UNFORMATTED|MESSY|BROKEN", re.IGNORECASE)
+
+# Rendered HTML keyed by a digest of the Markdown source, so re-saves of an
+# unchanged file skip the (pure Python) render. Keys are 16-byte digests, so the
+# cache doesn't hold on to file contents.
+_HTML_CACHE_SIZE = 512
+_html_cache: "OrderedDict[bytes, str]" = OrderedDict()
+
+
+def render_markdown(content: str) -> str:
+    """markdown.markdown() with an LRU cache keyed by content hash."""
+    key = hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+    html = _html_cache.get(key)
+    if html is not None:
+        _html_cache.move_to_end(key)
+        return html
+
+    html = markdown.markdown(content)
+    _html_cache[key] = html
+    if len(_html_cache) > _HTML_CACHE_SIZE:
+        _html_cache.popitem(last=False)
+    return html
+
 class ObsidianBridge(FileSystemEventHandler):
     """
     The Watchdog Agent.
     Monitors the Vault for new content and performs:
     1. Structural Linting (YAML, Links)
     2. Visual Verification (Rendering + Vision AI)
+    3. Consistency Check (against the World Primer, if provided)
     """
 
-    def __init__(self, vault_root: str, engine: CognitiveEngine = None):
+    def __init__(
+        self,
+        vault_root: str,
+        engine: CognitiveEngine = None,
+        world_primer: str = "",
+        batch_size: int = 10,
+        batch_window: float = 2.0,
+    ):
         self.vault_root = vault_root
+        # An engine passed in belongs to the caller, who closes it
+        self._owns_engine = engine is None
         self.engine = engine or CognitiveEngine()
+        self.consistency = ConsistencyController(engine=self.engine)
+        self.world_primer = world_primer
         self.registry = EntityRegistry(vault_root)
         self.observer = Observer()
+        self.loop = None
+        self.loop_thread = None
+        self.pending_paths = set()
         self.running = False
 
+        # Visual checks from a burst of new files are buffered and sent as one prompt
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._visual_coalescer = Coalescer(
+            self._verify_visual_items, batch_size, batch_window
+        )
+
     def start_watching(self):
         """Start the watchdog observer."""
         if not os.path.exists(self.vault_root):
             logging.error(f"Vault root {self.vault_root} does not exist.")
             return
 
+        self._ensure_loop()
         self.observer.schedule(self, self.vault_root, recursive=True)
         self.observer.start()
         self.running = True
@@ -40,6 +100,17 @@ class ObsidianBridge(FileSystemEventHandler):
         """Stop the watchdog observer."""
         self.observer.stop()
         self.observer.join()
+        if self._owns_engine:
+            # Close the pooled HTTP client on the loop that used it
+            if self.loop:
+                asyncio.run_coroutine_threadsafe(self.engine.aclose(), self.loop).result()
+            else:
+                asyncio.run(self.engine.aclose())
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join()
+            self.loop.close()
+            self.loop = None
         self.running = False
 
     def on_created(self, event):
@@ -47,17 +118,46 @@ class ObsidianBridge(FileSystemEventHandler):
         if event.is_directory or not event.src_path.endswith(".md"):
             return
 
+        if CLOSE_EVENTS_SUPPORTED:
+            # Process once the writer closes the file (see on_closed)
+            self.pending_paths.add(event.src_path)
+            return
+
         # Wait a moment for file write to complete
         time.sleep(1)
-        self.process_file(event.src_path)
+        self._dispatch(event.src_path)
+
+    def on_closed(self, event):
+        """Handle the writer closing a newly created file."""
+        if event.is_directory or event.src_path not in self.pending_paths:
+            return
 
-    def process_file(self, file_path: str):
+        self.pending_paths.discard(event.src_path)
+        self._dispatch(event.src_path)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Watchdog callbacks run on the observer thread, so the async pipeline
+        gets its own event loop in a dedicated thread, started on first use.
+        """
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+            self.loop_thread.start()
+        return self.loop
+
+    def _dispatch(self, file_path: str):
+        """Hand a file to the async pipeline."""
+        # Always the bridge's own loop: the engine's pooled HTTP client is bound to
+        # the loop it was first used on, so a fresh asyncio.run loop can't share it
+        asyncio.run_coroutine_threadsafe(self.process_file(file_path), self._ensure_loop())
+
+    async def process_file(self, file_path: str):
         """Run verification pipeline on a file."""
         logging.info(f"Processing new file: {file_path}")
         
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
+            content = await self._read_file(file_path)
         except Exception as e:
             logging.error(f"Failed to read file {file_path}: {e}")
             return
@@ -69,14 +169,33 @@ class ObsidianBridge(FileSystemEventHandler):
             self._mark_needs_review(file_path, "LINT_FAIL")
             return
 
-        # 2. Visual Verification (Async)
-        # We can't easily await here in the event handler without an event loop.
-        # For now, we'll skip the async vision check in the synchronous handler
-        # or run it via a helper if we had an event loop available.
-        # In a real app, we'd put this in a queue.
-        # For this implementation, we will expose verify_visuals as a method 
-        # that can be called explicitly or via a runner.
-        pass
+        # 2. Visual + Consistency checks (independent LLM calls, run concurrently)
+        checks = {"VISUAL_FAIL": self._queue_visual_check(file_path)}
+        if self.world_primer:
+            checks["CONSISTENCY_FAIL"] = self._check_consistency(content)
+
+        results = await asyncio.gather(*checks.values(), return_exceptions=True)
+        for reason, passed in zip(checks, results):
+            if isinstance(passed, Exception):
+                logging.error(f"{reason} check errored for {file_path}: {passed}")
+                continue
+            if not passed:
+                logging.warning(f"{reason} for {file_path}")
+                self._mark_needs_review(file_path, reason)
+                return
+
+    async def _check_consistency(self, content: str) -> bool:
+        """Check the file against the World Primer."""
+        is_consistent, report = await self.consistency.check_consistency(
+            content, self.world_primer, ""
+        )
+        if not is_consistent:
+            logging.warning(f"Contradictions found: {report}")
+        return is_consistent
+
+    async def _read_file(self, file_path: str) -> str:
+        """Read a file in a worker thread so disk waits don't stall the event loop."""
+        return await asyncio.to_thread(Path(file_path).read_text, encoding="utf-8")
 
     def lint_content(self, content: str) -> list[str]:
         """Check for structural issues."""
@@ -86,17 +205,30 @@ class ObsidianBridge(FileSystemEventHandler):
         if not content.startswith("---"):
             errors.append("Missing YAML frontmatter")
         
-        # Check for broken wikilinks (simple regex)
-        # [[Link]] -> Link
-        links = re.findall(r"\[\[(.*?)\]\]", content)
-        for link in links:
+        # Check for broken wikilinks in a single left-to-right scan
+        # [[Link]] -> Link (links don't span lines)
+        pos = 0
+        while True:
+            start = content.find("[[", pos)
+            if start == -1:
+                break
+            end = content.find("]]", start + 2)
+            if end == -1:
+                break
+            link = content[start + 2 : end]
+            if "\n" in link:
+                # Not a link at this position; retry from the next character
+                pos = start + 1
+                continue
+            pos = end + 2
+
             # Remove alias [[Link|Alias]]
-            target = link.split("|")[0]
+            target = link.partition("|")[0]
             # We would check registry here, but registry might be stale.
             # For now, just check if it looks malformed (e.g. empty)
             if not target.strip():
                 errors.append(f"Empty wikilink found: [[{link}]]")
-                
+
         return errors
 
     async def verify_visuals(self, file_path: str) -> bool:
@@ -105,11 +237,10 @@ class ObsidianBridge(FileSystemEventHandler):
         Returns True if passed, False if failed.
         """
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                
+            content = await self._read_file(file_path)
+
             # Convert to HTML
-            html = markdown.markdown(content)
+            html = render_markdown(content)
             
             # In a real headless setup, we would use Playwright/Selenium here.
             # Since we are in the agent environment, we have a 'browser' tool, 
@@ -152,7 +283,7 @@ class ObsidianBridge(FileSystemEventHandler):
             
             response = await self.engine.generate_async(prompt)
             
-            if "UNFORMATTED" in response.upper() or "MESSY" in response.upper() or "BROKEN" in response.upper():
+            if _FAIL_RE.search(response):
                 return False
                 
             return True
@@ -161,6 +292,64 @@ class ObsidianBridge(FileSystemEventHandler):
             logging.error(f"Visual verification failed: {e}")
             return False
 
+    async def verify_visuals_batch(self, file_paths: list[str]) -> dict[str, bool]:
+        """
+        Blind Visual check for several files in a single LLM call.
+        Returns {file_path: passed}. Files that can't be read or aren't
+        covered by the response are marked as failed.
+        """
+        if len(file_paths) == 1:
+            return {file_paths[0]: await self.verify_visuals(file_paths[0])}
+
+        results = {path: False for path in file_paths}
+        sections = []
+        for idx, path in enumerate(file_paths, 1):
+            try:
+                html = render_markdown(await self._read_file(path))
+                sections.append(f"### DOCUMENT {idx}\n{html[:5000]}")
+            except Exception as e:
+                logging.error(f"Visual verification failed for {path}: {e}")
+
+        if not sections:
+            return results
+
+        prompt = f"""
+        For each of the following {len(file_paths)} documents, analyze the HTML structure.
+        Does it look well-structured? Are there unclosed tags or messy code blocks?
+
+        Return a JSON list of objects: [{{"id": <document number>, "status": "CLEAN" or "MESSY" or "BROKEN"}}]
+
+        {chr(10).join(sections)}
+        """
+
+        try:
+            response = await self.engine.generate_async(
+                prompt, response_mime_type="application/json"
+            )
+            for item in json.loads(response):
+                idx = int(item.get("id", 0))
+                if 1 <= idx <= len(file_paths):
+                    status = str(item.get("status", "")).upper()
+                    results[file_paths[idx - 1]] = status == "CLEAN"
+        except Exception as e:
+            logging.error(f"Batch visual verification failed: {e}")
+
+        return results
+
+    async def _queue_visual_check(self, file_path: str) -> bool:
+        """Buffer a visual check so files arriving together share one LLM call."""
+        return await self._visual_coalescer.submit(file_path)
+
+    async def _verify_visual_items(self, file_paths: list[str]) -> list[bool]:
+        """Coalesced batch for _queue_visual_check; a failed call marks every file unclean."""
+        paths = list(dict.fromkeys(file_paths))
+        try:
+            results = await self.verify_visuals_batch(paths)
+        except Exception as e:
+            logging.error(f"Batch visual verification failed: {e}")
+            results = {}
+        return [results.get(path, False) for path in file_paths]
+
     def _mark_needs_review(self, file_path: str, reason: str):
         """Rename file to indicate review needed."""
         dirname, filename = os.path.split(file_path)
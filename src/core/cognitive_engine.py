@@ -1,9 +1,16 @@
 import os
-from typing import Optional
+import json
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+import httpx
 from google import genai
-from google.genai import types
-from tenacity import retry, stop_after_attempt, wait_exponential
+from google.genai import errors, types
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+from src.utils.coalescer import Coalescer
 import time
+import threading
 
 class BudgetExceededError(Exception):
     """Raised when the daily token budget is exceeded."""
@@ -12,82 +19,339 @@ class BudgetExceededError(Exception):
 class TokenBucket:
     """
     Simple token bucket for rate limiting and budget tracking.
+    Thread-safe: concurrent generate_async calls share one bucket.
     """
+    # Read on every generate_async call
+    __slots__ = ("max_tokens", "current_usage", "_near_limit_at", "last_reset", "_lock")
+
     def __init__(self, max_tokens: int):
         self.max_tokens = max_tokens
         self.current_usage = 0
+        # Integer 90% mark, so near_limit() is a plain int comparison per call
+        self._near_limit_at = max_tokens * 9 // 10
         self.last_reset = time.time()
-        
+        self._lock = threading.Lock()
+
     def check_budget(self, estimated_cost: int = 0):
         """Check if we have enough budget."""
-        if self.current_usage + estimated_cost > self.max_tokens:
-            raise BudgetExceededError(f"Daily limit of {self.max_tokens} tokens exceeded. Current: {self.current_usage}")
-            
+        with self._lock:
+            if self.current_usage + estimated_cost > self.max_tokens:
+                raise BudgetExceededError(f"Daily limit of {self.max_tokens} tokens exceeded. Current: {self.current_usage}")
+
+    def reserve(self, estimated_cost: int) -> int:
+        """
+        Check the budget and debit the estimate in one step, so concurrent
+        requests can't all pass the check before any of them is charged.
+        Settle with add_usage(actual - reserved) once the real count is known.
+        """
+        if not estimated_cost:
+            # Nothing to debit: a single int read needs no lock
+            if self.current_usage > self.max_tokens:
+                raise BudgetExceededError(f"Daily limit of {self.max_tokens} tokens exceeded. Current: {self.current_usage}")
+            return 0
+        with self._lock:
+            if self.current_usage + estimated_cost > self.max_tokens:
+                raise BudgetExceededError(f"Daily limit of {self.max_tokens} tokens exceeded. Current: {self.current_usage}")
+            self.current_usage += estimated_cost
+        return estimated_cost
+
+    def near_limit(self) -> bool:
+        """True once 90% of the budget is used; only then are pre-checks estimated."""
+        return self.current_usage > self._near_limit_at
+
     def add_usage(self, tokens: int):
         """Add usage to the bucket."""
-        self.current_usage += tokens
+        with self._lock:
+            self.current_usage += tokens
         # In a real app, we'd persist this or reset daily.
         # For now, it's in-memory per session.
 
 
+# Upper bound on concurrent requests sharing the HTTP/2 connection pool
+MAX_CONCURRENCY = 64
+
+# text-embedding-004 accepts up to 100 texts per request
+EMBED_BATCH_SIZE = 100
+# Length of a text-embedding-004 vector
+EMBEDDING_DIM = 768
+# How long embed_async waits for other calls to join its batch
+EMBED_BATCH_WINDOW = 0.05
+
+CACHE_REGISTRY_PATH = os.path.join(os.path.expanduser("~"), ".worldsmith", "gemini_cache.json")
+
+
+def is_cache_error(exc: BaseException) -> bool:
+    """
+    True for a request rejected because its cached_content is gone or not
+    accessible (expired, deleted, or created under another API key).
+    """
+    return isinstance(exc, errors.ClientError) and exc.code in (400, 403, 404)
+
+
+@dataclass
+class EngineConfig:
+    """Settings for CognitiveEngine; from_env() reads the usual environment variables."""
+
+    api_key: Optional[str] = None
+    max_daily_tokens: int = 1000000
+
+    @classmethod
+    def from_env(cls) -> "EngineConfig":
+        return cls(
+            api_key=os.environ.get("GOOGLE_API_KEY"),
+            max_daily_tokens=int(os.environ.get("MAX_DAILY_TOKENS", 1000000)),
+        )
+
+
 class CognitiveEngine:
     """
     High-velocity async inference wrapper for Gemini 2.5 Flash-Lite.
     Supports Context Caching for large system instructions.
     """
 
-    def __init__(self):
+    # Shared across instances: "model:sha256(system_instruction)" -> {"name", "expire_at"}
+    _cache_registry: dict = {}
+    # Keys whose caches.create failed -> time until which it isn't retried (not persisted)
+    _failed_caches: dict = {}
+
+    def __init__(self, config: Optional[EngineConfig] = None):
         """
         Initialize the unified genai.Client for Gemini API.
+        Settings come from the environment unless a config is passed.
         """
-        api_key = os.environ.get("GOOGLE_API_KEY")
+        config = config or EngineConfig.from_env()
+        api_key = config.api_key
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable not set")
 
         # Standard Gemini API mode
-        self.client = genai.Client(api_key=api_key)
+        # Async calls share one HTTP/2 connection pool, so concurrent requests are
+        # multiplexed instead of each paying for a new TLS handshake.
+        self.http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=MAX_CONCURRENCY,
+                max_connections=MAX_CONCURRENCY,
+            ),
+        )
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(httpx_async_client=self.http_client),
+        )
 
         self.model_name = "gemini-2.5-flash-lite"
+        # Cache names are only valid for the key that created them
+        self._cache_scope = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
         self.cached_content_name = None
         
         # Initialize Token Bucket (Default 1M tokens)
-        max_tokens = int(os.environ.get("MAX_DAILY_TOKENS", 1000000))
-        self.token_bucket = TokenBucket(max_tokens)
+        self.token_bucket = TokenBucket(config.max_daily_tokens)
 
-    def create_cache(self, system_instruction: str, ttl_minutes: int = 60):
+        # Coalescing buffer for single embed_async calls
+        self._embed_coalescer = Coalescer(
+            self._embed_texts, EMBED_BATCH_SIZE, EMBED_BATCH_WINDOW
+        )
+
+    async def aclose(self):
+        """Close the pooled HTTP client. The engine can't make requests afterwards."""
+        await self.http_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def _cache_key(self, system_instruction: str) -> str:
+        digest = hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()
+        return f"{self._cache_scope}:{self.model_name}:{digest}"
+
+    @classmethod
+    def _load_cache_registry(cls) -> dict:
+        """Merge the on-disk cache registry into the in-memory one."""
+        try:
+            with open(CACHE_REGISTRY_PATH, "r", encoding="utf-8") as f:
+                cls._cache_registry.update(json.load(f))
+        except (IOError, OSError, ValueError):
+            pass
+        return cls._cache_registry
+
+    @classmethod
+    def _save_cache_registry(cls):
+        now = time.time()
+        live = {k: v for k, v in cls._cache_registry.items() if v["expire_at"] > now}
+        try:
+            # Serialize before opening so a bad entry can't leave a truncated file
+            data = json.dumps(live, indent=2)
+            os.makedirs(os.path.dirname(CACHE_REGISTRY_PATH), exist_ok=True)
+            with open(CACHE_REGISTRY_PATH, "w", encoding="utf-8") as f:
+                f.write(data)
+        except (IOError, OSError, TypeError, ValueError) as e:
+            print(f"Warning: Failed to persist cache registry: {e}")
+
+    def _lookup_cache(self, key: str) -> tuple[bool, Optional[str]]:
         """
-        Create a cached content object for the system instruction.
-        This reduces token usage for repeated calls with the same system prompt.
+        Return (found, name) for a cache key. A recent failed create is found
+        with name None, so callers fall back to the standard prompt without
+        trying caches.create again.
         """
-        try:
-            # Create cache config
-            # Note: The exact syntax depends on the SDK version.
-            # Assuming google-genai v0.3+ / v1.0 structure.
+        now = time.time()
+        if self._failed_caches.get(key, 0) > now:
+            return True, None
+        entry = self._cache_registry.get(key) or self._load_cache_registry().get(key)
+        # Keep a minute of headroom so the cache doesn't expire mid-request
+        if entry and entry["expire_at"] - now > 60:
+            return True, entry["name"]
+        return False, None
 
-            # We'll use a fixed name or let the API generate one.
-            # For simplicity, we'll create a new one each time this is called,
-            # but in a real app you'd check if one exists.
+    def _remember_cache(self, key: str, cached_content, ttl_minutes: int) -> Optional[str]:
+        """Record a created cache, or a failed create (cached_content None), for the TTL."""
+        expire_at = time.time() + ttl_minutes * 60
+        if cached_content is None:
+            self._failed_caches[key] = expire_at
+            return None
+        self._failed_caches.pop(key, None)
+        self._cache_registry[key] = {"name": cached_content.name, "expire_at": expire_at}
+        self._save_cache_registry()
+        return cached_content.name
 
-            cache_config = types.CreateCachedContentConfig(
-                system_instruction=system_instruction,
-                ttl=f"{ttl_minutes * 60}s",
-            )
+    def _forget_cache(self, key: str):
+        """Drop a cache entry the server no longer accepts, in memory and on disk."""
+        if self._cache_registry.pop(key, None) is not None:
+            self._save_cache_registry()
+
+    def forget_cache(self, system_instruction: str):
+        """
+        Call when a request using this instruction's cached_content fails with
+        is_cache_error(); the next get_or_create_cache creates a fresh cache.
+        """
+        self._forget_cache(self._cache_key(system_instruction))
 
+    @staticmethod
+    def _cache_config(system_instruction: str, ttl_minutes: int) -> types.CreateCachedContentConfig:
+        return types.CreateCachedContentConfig(
+            system_instruction=system_instruction,
+            ttl=f"{ttl_minutes * 60}s",
+        )
+
+    def get_or_create_cache(
+        self, system_instruction: str, ttl_minutes: int = 60
+    ) -> Optional[str]:
+        """
+        Return the name of a cached content object for the system instruction.
+        Caches are shared between engine instances and across runs (persisted
+        to CACHE_REGISTRY_PATH), so caches.create is only called on a miss or
+        when the previous cache is about to expire.
+        Returns None if the cache could not be created.
+        Blocking; async code should use get_or_create_cache_async.
+        """
+        key = self._cache_key(system_instruction)
+        found, name = self._lookup_cache(key)
+        if found:
+            return name
+
+        try:
             cached_content = self.client.caches.create(
-                model=self.model_name, config=cache_config
+                model=self.model_name,
+                config=self._cache_config(system_instruction, ttl_minutes),
+            )
+            print(f"Created Gemini Cache: {cached_content.name}")
+        except Exception as e:
+            print(
+                f"Warning: Failed to create cache: {e}. Falling back to standard prompt."
             )
-            self.cached_content_name = cached_content.name
-            print(f"Created Gemini Cache: {self.cached_content_name}")
+            cached_content = None
 
+        return self._remember_cache(key, cached_content, ttl_minutes)
+
+    async def get_or_create_cache_async(
+        self, system_instruction: str, ttl_minutes: int = 60
+    ) -> Optional[str]:
+        """Non-blocking get_or_create_cache using client.aio.caches.create."""
+        key = self._cache_key(system_instruction)
+        found, name = self._lookup_cache(key)
+        if found:
+            return name
+
+        try:
+            cached_content = await self.client.aio.caches.create(
+                model=self.model_name,
+                config=self._cache_config(system_instruction, ttl_minutes),
+            )
+            print(f"Created Gemini Cache: {cached_content.name}")
         except Exception as e:
             print(
                 f"Warning: Failed to create cache: {e}. Falling back to standard prompt."
             )
-            self.cached_content_name = None
+            cached_content = None
+
+        return self._remember_cache(key, cached_content, ttl_minutes)
+
+    def create_cache(self, system_instruction: str, ttl_minutes: int = 60):
+        """
+        Create (or reuse) a cached content object for the system instruction.
+        This reduces token usage for repeated calls with the same system prompt.
+        """
+        self.cached_content_name = self.get_or_create_cache(
+            system_instruction, ttl_minutes
+        )
+
+    def _reserve_budget(self, prompt: str) -> int:
+        """
+        Check budget before request and reserve the estimate. Only estimate input
+        tokens when close to the limit; otherwise the real count comes back in
+        usage_metadata. Returns the number of tokens reserved.
+        """
+        if self.token_bucket.near_limit():
+            # 1 char ~= 0.25 tokens. Let's be conservative.
+            return self.token_bucket.reserve(len(prompt) // 3)
+        return self.token_bucket.reserve(0)
+
+    def _track_usage(self, usage_metadata, prompt: str, output: str, reserved: int = 0):
+        """
+        Add the reported token count to the bucket, estimating if unavailable.
+        The tokens reserved before the request are credited back.
+        """
+        try:
+            # Attempt to get usage metadata
+            total_tokens = usage_metadata.total_token_count
+        except Exception:
+            total_tokens = None
+        if not isinstance(total_tokens, int):
+            # Fallback estimation
+            total_tokens = (len(prompt) + len(output)) // 3
+        self.token_bucket.add_usage(total_tokens - reserved)
+
+    def _build_config(
+        self,
+        system_instruction: Optional[str],
+        response_mime_type: Optional[str],
+        cached_content: Optional[str],
+    ) -> types.GenerateContentConfig:
+        # If we have a valid cache and no specific system instruction override is passed,
+        # use the cache.
+        cached_content = cached_content or self.cached_content_name
+        if cached_content and system_instruction is None:
+            # When using cache, we pass the cache name in the config or model argument
+            # The SDK usually allows passing 'cached_content' in config
+            # Note: When using cached content, 'model' arg might need to be omitted or specific.
+            # But usually passing the model name is fine.
+            return types.GenerateContentConfig(
+                response_mime_type=response_mime_type,
+                cached_content=cached_content,
+            )
+
+        # Standard path
+        return types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            response_mime_type=response_mime_type,
+        )
 
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
+        # A rejected cached_content won't recover; the caller falls back instead
+        retry=retry_if_exception(lambda e: not is_cache_error(e)),
         reraise=True,
     )
     async def generate_async(
@@ -96,81 +360,130 @@ class CognitiveEngine:
         image: Optional[bytes] = None,
         system_instruction: Optional[str] = None,
         response_mime_type: Optional[str] = None,
+        cached_content: Optional[str] = None,
     ) -> str:
         """
         Non-blocking generation using client.aio.models.generate_content.
         Optimized for high throughput (4,000 RPM).
         Supports Image input for Vision capabilities.
         Enforces Token Budget.
+        cached_content selects a specific cache (see get_or_create_cache)
+        instead of the engine-wide one.
         """
-        # Check budget before request (estimate input tokens roughly)
-        # 1 char ~= 0.25 tokens. Let's be conservative.
-        estimated_input = len(prompt) // 3
-        self.token_bucket.check_budget(estimated_input)
-        
+        reserved = self._reserve_budget(prompt)
+
         contents = [prompt]
         if image:
             contents.append(types.Part.from_bytes(data=image, mime_type="image/png"))
 
-        # If we have a valid cache and no specific system instruction override is passed,
-        # use the cache.
-        if self.cached_content_name and system_instruction is None:
-            # When using cache, we pass the cache name in the config or model argument
-            # The SDK usually allows passing 'cached_content' in config
-            config = types.GenerateContentConfig(
-                response_mime_type=response_mime_type,
-                cached_content=self.cached_content_name,
-            )
-
-            # Note: When using cached content, 'model' arg might need to be omitted or specific.
-            # But usually passing the model name is fine.
+        config = self._build_config(system_instruction, response_mime_type, cached_content)
+        try:
             response = await self.client.aio.models.generate_content(
                 model=self.model_name, contents=contents, config=config
             )
-        else:
-            # Standard path
-            config = types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                response_mime_type=response_mime_type,
-            )
+        except BaseException:
+            # Release the reservation; the retry reserves again
+            self.token_bucket.add_usage(-reserved)
+            raise
 
-            response = await self.client.aio.models.generate_content(
-                model=self.model_name, contents=contents, config=config
-            )
+        self._track_usage(response.usage_metadata, prompt, response.text, reserved)
+
+        return response.text
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        # A rejected cached_content won't recover; the caller falls back instead
+        retry=retry_if_exception(lambda e: not is_cache_error(e)),
+        reraise=True,
+    )
+    async def _open_stream(self, prompt: str, config: types.GenerateContentConfig):
+        """
+        Start a content stream and read its first chunk, retried like generate_async.
+        Nothing has been yielded to the caller yet, so a failed attempt is safe to repeat.
+        Returns: (chunk iterator, first chunk or None for an empty stream)
+        """
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model_name, contents=[prompt], config=config
+        )
+        chunks = aiter(stream)
+        return chunks, await anext(chunks, None)
+
+    async def generate_async_stream(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        response_mime_type: Optional[str] = None,
+        cached_content: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of generate_async using client.aio.models.generate_content_stream.
+        Yields text chunks as they arrive so callers can start parsing early.
+        Usage is tracked even if the caller stops iterating before the end;
+        a failed request without usage metadata releases its reservation instead.
+        """
+        reserved = self._reserve_budget(prompt)
 
-        # Track usage
+        config = self._build_config(system_instruction, response_mime_type, cached_content)
+        usage_metadata = None
+        output = []
         try:
-            # Attempt to get usage metadata
-            usage = response.usage_metadata
-            if usage:
-                total_tokens = usage.total_token_count
-                self.token_bucket.add_usage(total_tokens)
+            chunks, chunk = await self._open_stream(prompt, config)
+            while chunk is not None:
+                # Usage metadata is reported on the final chunk(s)
+                usage_metadata = chunk.usage_metadata or usage_metadata
+                if chunk.text:
+                    output.append(chunk.text)
+                    yield chunk.text
+                chunk = await anext(chunks, None)
+        except GeneratorExit:
+            # The caller stopped early; it still received (and pays for) the output
+            self._track_usage(usage_metadata, prompt, "".join(output), reserved)
+            raise
+        except BaseException:
+            if usage_metadata is None:
+                self.token_bucket.add_usage(-reserved)
             else:
-                # Fallback estimation
-                output_len = len(response.text) // 3
-                self.token_bucket.add_usage(estimated_input + output_len)
-        except Exception:
-            # If accessing usage fails, just estimate
-            output_len = len(response.text) // 3
-            self.token_bucket.add_usage(estimated_input + output_len)
-
-        return response.text
+                self._track_usage(usage_metadata, prompt, "".join(output), reserved)
+            raise
+        else:
+            self._track_usage(usage_metadata, prompt, "".join(output), reserved)
 
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=5),
         reraise=True,
     )
+    async def _embed_request(self, texts: list[str]) -> list[list[float]]:
+        """One embed_content request of at most EMBED_BATCH_SIZE texts, retried on failure."""
+        response = await self.client.aio.models.embed_content(
+            model="text-embedding-004",
+            contents=texts,
+        )
+        return [e.values for e in response.embeddings]
+
+    async def embed_batch_async(self, texts: list[str]) -> list[list[float]]:
+        """
+        Generate embeddings for many texts using text-embedding-004 (768 dimensions).
+        Sends up to EMBED_BATCH_SIZE texts per request, each retried separately.
+        Raises if a request still fails after its retries.
+        """
+        embeddings = []
+        for i in range(0, len(texts), EMBED_BATCH_SIZE):
+            embeddings.extend(await self._embed_request(texts[i : i + EMBED_BATCH_SIZE]))
+        return embeddings
+
     async def embed_async(self, text: str) -> list[float]:
         """
         Generate embeddings using text-embedding-004 (768 dimensions).
+        Concurrent calls are coalesced into a single embed_batch_async request.
         """
+        return await self._embed_coalescer.submit(text)
+
+    async def _embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Coalesced batch for embed_async; a failed request yields empty embeddings."""
         try:
-            response = await self.client.aio.models.embed_content(
-                model="text-embedding-004",
-                contents=text,
-            )
-            return response.embeddings[0].values
+            return await self.embed_batch_async(texts)
         except Exception as e:
             print(f"Embedding failed: {e}")
-            return []
+            return [[] for _ in texts]
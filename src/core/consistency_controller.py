@@ -1,4 +1,7 @@
-from src.core.cognitive_engine import CognitiveEngine
+import io
+import json
+from contextlib import aclosing
+from src.core.cognitive_engine import CognitiveEngine, is_cache_error
 
 
 class ConsistencyController:
@@ -7,8 +10,34 @@ class ConsistencyController:
     Responsible for preventing contradictions and ensuring canonical integrity.
     """
 
-    def __init__(self):
-        self.engine = CognitiveEngine()
+    def __init__(self, engine: CognitiveEngine = None):
+        self.engine = engine or CognitiveEngine()
+
+    def _primer_instruction(self, world_primer: str) -> str:
+        """Static part of the prompt; cached once per World Primer."""
+        return f"""
+        You are the Consistency Controller. Your job is to find LOGICAL CONTRADICTIONS in new text.
+
+        WORLD PRIMER (THE TRUTH):
+        {world_primer}
+        """
+
+    async def _read_json(self, stream) -> dict:
+        """
+        Parse as soon as a complete top-level object has arrived instead of
+        waiting for the tail of the stream.
+        """
+        buffer = io.StringIO()
+        decoder = json.JSONDecoder()
+        async with aclosing(stream):
+            async for chunk in stream:
+                buffer.write(chunk)
+                if "}" in chunk:
+                    try:
+                        return decoder.raw_decode(buffer.getvalue().lstrip())[0]
+                    except ValueError:
+                        continue
+        return json.loads(buffer.getvalue())
 
     async def check_consistency(
         self, content: str, world_primer: str, lore_context: str
@@ -19,21 +48,16 @@ class ConsistencyController:
         """
 
         prompt = f"""
-        You are the Consistency Controller. Your job is to find LOGICAL CONTRADICTIONS in this new text.
-        
-        WORLD PRIMER (THE TRUTH):
-        {world_primer}
-        
         ESTABLISHED LORE (CONTEXT):
         {lore_context}
-        
+
         NEW DRAFT CONTENT:
         {content[:15000]}
-        
+
         TASK:
         Analyze the New Draft for contradictions against the Primer and Lore.
         Ignore minor stylistic differences. Focus on FACTS (dates, names, physics, laws, history).
-        
+
         OUTPUT FORMAT:
         Return a JSON object:
         {{
@@ -44,12 +68,34 @@ class ConsistencyController:
         """
 
         try:
-            response = await self.engine.generate_async(
-                prompt, response_mime_type="application/json"
-            )
-            import json
+            # The primer lives in a shared context cache, so each call only sends the draft.
+            system_instruction = self._primer_instruction(world_primer)
+            cache_name = await self.engine.get_or_create_cache_async(system_instruction)
+
+            if cache_name:
+                try:
+                    result = await self._read_json(
+                        self.engine.generate_async_stream(
+                            prompt,
+                            response_mime_type="application/json",
+                            cached_content=cache_name,
+                        )
+                    )
+                except Exception as e:
+                    if not is_cache_error(e):
+                        raise
+                    # Expired, deleted or foreign cache: drop it and send the primer inline
+                    self.engine.forget_cache(system_instruction)
+                    cache_name = None
 
-            result = json.loads(response)
+            if not cache_name:
+                result = await self._read_json(
+                    self.engine.generate_async_stream(
+                        prompt,
+                        system_instruction=system_instruction,
+                        response_mime_type="application/json",
+                    )
+                )
 
             is_consistent = result.get("status") == "PASS"
             report = result.get("contradictions", [])
@@ -1,7 +1,24 @@
 import json
 import os
+import time
+import atexit
+import heapq
+import orjson
 from typing import Dict, Optional
-from datetime import datetime
+from src.utils.lifecycle import flush_at_exit
+
+# Minimum seconds between queue writes triggered by add_entity
+SAVE_INTERVAL = 0.5
+
+# Base score indexed by tier; tiers outside the table (0, 7+, 99) score 10
+_TIER_SCORES = (10, 100, 80, 60, 40, 20, 10)
+
+
+def _json_default(obj):
+    """orjson hook: mentions are kept as sets in memory, sorted lists on disk."""
+    if isinstance(obj, set):
+        return sorted(obj)
+    raise TypeError
 
 
 class ContinuityDirector:
@@ -18,25 +35,63 @@ class ContinuityDirector:
         self.queue_path = os.path.join(root_dir, "priority_queue.json")
         self.queue_data = self._load_queue()
 
+        # Max-priority heap of (-score, tier, order, name); stale entries are
+        # discarded lazily in get_next_entity. "order" keeps insertion order
+        # as the final tie-breaker.
+        self._order = {name: i for i, name in enumerate(self.queue_data["queue"])}
+        self._heap = [
+            (-node["score"], node["tier"], self._order[name], name)
+            for name, node in self.queue_data["queue"].items()
+            if node["status"] == "pending"
+        ]
+        heapq.heapify(self._heap)
+
+        self._dirty = False
+        self._last_save = 0.0
+        self._exit_hook = flush_at_exit(self)
+
     def _load_queue(self) -> Dict:
         if os.path.exists(self.queue_path):
             try:
                 with open(self.queue_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
+                    data = json.load(f)
+                for node in data["queue"].values():
+                    node["mentions"] = set(node["mentions"])
+                return data
             except Exception:
                 return self._init_empty_queue()
         return self._init_empty_queue()
 
     def _init_empty_queue(self) -> Dict:
         return {
-            "queue": {},  # "Entity Name": {score: 100, tier: 1, mentions: [], status: "pending"}
+            "queue": {},  # "Entity Name": {score: 100, tier: 1, mentions: set(), status: "pending"}
             "completed": [],
             "history": [],
         }
 
     def save_queue(self):
-        with open(self.queue_path, "w", encoding="utf-8") as f:
-            json.dump(self.queue_data, f, indent=2)
+        # Write to a temp file and rename over the old one so a crash mid-write
+        # never leaves a truncated queue behind.
+        tmp_path = self.queue_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(
+                orjson.dumps(
+                    self.queue_data, default=_json_default, option=orjson.OPT_INDENT_2
+                )
+            )
+        os.replace(tmp_path, self.queue_path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def flush(self):
+        """Write pending add_entity updates to disk."""
+        if self._dirty:
+            self.save_queue()
+
+    def close(self):
+        """Write pending updates and drop the exit-time flush."""
+        self.flush()
+        atexit.unregister(self._exit_hook)
 
     def add_entity(self, entity: str, source: str, tier: int = 5):
         """
@@ -52,18 +107,19 @@ class ContinuityDirector:
 
         # Initialize if new
         if entity not in self.queue_data["queue"]:
+            self._order[entity] = len(self._order)
             self.queue_data["queue"][entity] = {
                 "score": 0,
                 "tier": tier,
-                "mentions": [],
+                "mentions": set(),
                 "status": "pending",
-                "added_at": datetime.now().isoformat(),
+                "added_at": time.time_ns(),  # epoch ns; cheaper than formatting a datetime
             }
 
         # Update Metadata
         node = self.queue_data["queue"][entity]
-        if source not in node["mentions"]:
-            node["mentions"].append(source)
+        previous = (node["score"], node["tier"])
+        node["mentions"].add(source)
 
         # Update Tier if new tier is higher (lower number)
         if tier < node["tier"]:
@@ -71,8 +127,15 @@ class ContinuityDirector:
 
         # Recalculate Score
         node["score"] = self._calculate_score(node)
-
-        self.save_queue()
+        if node["status"] == "pending" and (node["score"], node["tier"]) != previous:
+            heapq.heappush(
+                self._heap, (-node["score"], node["tier"], self._order[entity], entity)
+            )
+
+        # Debounce disk writes; mark_complete and flush() always write
+        self._dirty = True
+        if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+            self.save_queue()
 
     def _calculate_score(self, node: Dict) -> int:
         """
@@ -82,8 +145,8 @@ class ContinuityDirector:
         - Tier 1 Mention Bonus: +20 if mentioned by a Tier 1 entity (requires lookup, simplified here)
         """
         # Base Score
-        tier_scores = {1: 100, 2: 80, 3: 60, 4: 40, 5: 20, 6: 10}
-        score = tier_scores.get(node["tier"], 10)
+        tier = node["tier"]
+        score = _TIER_SCORES[tier] if 0 <= tier < len(_TIER_SCORES) else 10
 
         # Mention Bonus (Cap at 50)
         mention_bonus = min(len(node["mentions"]) * 5, 50)
@@ -95,20 +158,21 @@ class ContinuityDirector:
         """
         Returns the highest scoring pending entity.
         """
-        pending = [
-            (name, data)
-            for name, data in self.queue_data["queue"].items()
-            if data["status"] == "pending"
-        ]
-
-        if not pending:
-            return None
-
-        # Sort by Score (Desc), then Tier (Asc)
-        # We use negative tier for sorting because lower tier number = higher priority
-        pending.sort(key=lambda x: (x[1]["score"], -x[1]["tier"]), reverse=True)
-
-        return pending[0][0]
+        queue = self.queue_data["queue"]
+        while self._heap:
+            neg_score, tier, _, name = self._heap[0]
+            node = queue.get(name)
+            if (
+                node is not None
+                and node["status"] == "pending"
+                and node["score"] == -neg_score
+                and node["tier"] == tier
+            ):
+                return name
+            # Entry is outdated (rescored, retiered or completed)
+            heapq.heappop(self._heap)
+
+        return None
 
     def mark_complete(self, entity: str):
         if entity in self.queue_data["queue"]:
@@ -1,6 +1,11 @@
 import re
 from typing import Tuple, List
 
+_FENCE_OPEN = re.compile(r"^```(?:markdown|yaml|json)?\s*\n", re.MULTILINE)
+_FENCE_CLOSE = re.compile(r"\n```\s*$", re.MULTILINE)
+# Content markers checked by review_content, collected in one scan
+_VIOLATIONS = re.compile(r"> \[!infobox|\[\[Source:|In conclusion|In summary")
+
 
 class EditorialDirector:
     """
@@ -24,24 +29,30 @@ class EditorialDirector:
         """
         entity_type, target_count, _ = density_settings
         feedback = []
+        missing = False  # any "Missing ..." issue forces a rejection
 
         # 1. Auto-Fix Formatting
         content = self._fix_formatting(content)
 
+        found = {m.group() for m in _VIOLATIONS.finditer(content)}
+
         # 2. Validate Structure
         if not content.startswith("---"):
             feedback.append("Missing YAML frontmatter")
+            missing = True
             # Attempt to fix? Maybe later.
 
-        if "> [!infobox" not in content and "> [!infobox" not in content:
+        if "> [!infobox" not in found:
             feedback.append("Missing Sidebar/Infobox")
+            missing = True
 
-        if "[[Source:" in content:
+        if "[[Source:" in found:
             feedback.append("Leftover Source placeholders found")
 
         # 3. Validate Word Count
-        word_count = len(content.split())
+        # Exact count: space-based estimates over-count padded tables and indented lists
         min_acceptable = int(target_count * 0.8)
+        word_count = len(content.split())
 
         if word_count < min_acceptable:
             feedback.append(f"Low density: {word_count} words (Target: {target_count})")
@@ -50,11 +61,11 @@ class EditorialDirector:
             status = "approved"
 
         # 4. Voice Check (Simple heuristics)
-        if "In conclusion" in content or "In summary" in content:
+        if "In conclusion" in found or "In summary" in found:
             feedback.append("Detected essay-style conclusion (Voice Violation)")
 
         # Final Status Determination
-        if any("Missing" in f for f in feedback):
+        if missing:
             status = "rejected"
 
         return content, status, feedback
@@ -64,10 +75,8 @@ class EditorialDirector:
         Strips code fences and standardizes Obsidian format.
         """
         # Strip code fences
-        content = re.sub(
-            r"^```(?:markdown|yaml|json)?\s*\n", "", content, flags=re.MULTILINE
-        )
-        content = re.sub(r"\n```\s*$", "", content, flags=re.MULTILINE)
+        content = _FENCE_OPEN.sub("", content)
+        content = _FENCE_CLOSE.sub("", content)
 
         # Ensure single H1
         # (Complex regex, maybe skip for now)
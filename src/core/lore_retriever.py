@@ -1,18 +1,102 @@
 import os
-import glob
-import json
 import logging
+import threading
+import uuid
+from contextlib import contextmanager
+from collections import OrderedDict
 from typing import Dict, List, Optional
 import chromadb
+import orjson
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from json.decoder import JSONDecodeError
+from postgrest import ReturnMethod
 from supabase import create_client, Client
-from src.core.cognitive_engine import CognitiveEngine
+from src.core.cognitive_engine import CognitiveEngine, EMBEDDING_DIM
 import asyncio
 
 # Basic logging configuration for consistency until a proper system is added
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
 
+# Files read concurrently per gather() while indexing
+READ_BATCH_SIZE = 32
+# Query embeddings kept per retriever (entity names repeat across a run)
+QUERY_EMBEDDING_CACHE_SIZE = 256
+# Applied to Chroma's SQLite connection during index_lore only, never at query time
+_BULK_PRAGMAS = {"journal_mode": "off", "synchronous": "off", "temp_store": "memory"}
+# Decoded file bodies kept for repeated full-file loads, bounded by total characters
+READ_CACHE_MAX_CHARS = 8 * 1024 * 1024
+# Larger files are read on every load instead of being pinned in the cache
+READ_CACHE_MAX_FILE_SIZE = 256 * 1024
+# Chunks of ~512 tokens with ~50 tokens of overlap, at the engine's ~3 chars/token estimate
+CHUNK_SIZE = 512 * 3
+CHUNK_OVERLAP = 50 * 3
+# An exact canon match shorter than this still gets semantic matches with depth="auto"
+THIN_MATCH_CHARS = 2000
+
+
+def _read_text(file_path: str) -> str:
+    # A plain read: every caller needs the whole str, which mmap would not avoid
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+class _ReadCache:
+    """
+    LRU of decoded file bodies, keyed on path and checked against mtime so an
+    edited file is re-read and its old body dropped. Bounded by total characters.
+    Shared by the to_thread workers, hence the lock.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[str, tuple[int, str]]" = OrderedDict()  # path -> (mtime_ns, text)
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def read(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        if stat.st_size > READ_CACHE_MAX_FILE_SIZE:
+            return _read_text(file_path)
+
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and entry[0] == stat.st_mtime_ns:
+                self._entries.move_to_end(file_path)
+                return entry[1]
+
+        text = _read_text(file_path)
+        with self._lock:
+            old = self._entries.pop(file_path, None)
+            if old is not None:
+                self._chars -= len(old[1])
+            self._entries[file_path] = (stat.st_mtime_ns, text)
+            self._chars += len(text)
+            while self._chars > self.max_chars:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._chars -= len(evicted)
+        return text
+
+
+_read_cache = _ReadCache(READ_CACHE_MAX_CHARS)
+
+
+def _iter_md(root: str):
+    """Yield markdown paths under root, skipping hidden entries like glob does."""
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            yield from _iter_md(entry.path)
+        elif entry.name.endswith(".md"):
+            yield entry.path
+
+
 class LoreRetriever:
     """
     Handles read-only knowledge retrieval from source directory with cache support.
@@ -23,7 +107,12 @@ class LoreRetriever:
     """
 
     def __init__(
-        self, source_path: str, vault_root: str = None, use_cache: bool = True, use_supabase: bool = False
+        self,
+        source_path: str,
+        vault_root: str = None,
+        use_cache: bool = True,
+        use_supabase: bool = False,
+        engine: CognitiveEngine = None,
     ):
         self.source_path = source_path
         self.vault_root = vault_root
@@ -33,7 +122,14 @@ class LoreRetriever:
         self.chroma_client = None
         self.collection = None
         self.supabase: Optional[Client] = None
-        self.engine = CognitiveEngine()
+        self.engine = engine or CognitiveEngine()
+        self._name_index: Optional[Dict[str, str]] = None  # lowercase filename -> path
+        self._query_embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            separators=["\n\n", "\n", ". ", " "],
+        )
 
         # Ensure we don't crash if path doesn't exist
         if not os.path.exists(self.source_path):
@@ -72,11 +168,9 @@ class LoreRetriever:
 
             self.chroma_client = chromadb.PersistentClient(path=db_path)
 
-            # Use default embedding function (all-MiniLM-L6-v2)
-            # In production, you might want a specific model, but default is fine for now.
-            self.collection = self.chroma_client.get_or_create_collection(
-                name="world_lore", metadata={"hnsw:space": "cosine"}
-            )
+            # Embeddings come from CognitiveEngine (text-embedding-004), so Chroma
+            # never runs its own embedding model.
+            self.collection = self._open_collection()
 
             # Check if we need to index (simple check: if empty)
             if self.collection.count() == 0:
@@ -90,6 +184,59 @@ class LoreRetriever:
             logging.error(f"Failed to initialize Vector DB: {e}", exc_info=True)
             self.chroma_client = None
 
+    def _open_collection(self):
+        """
+        Open the lore collection, rebuilding it empty if it was indexed with a
+        different embedder (e.g. Chroma's default 384-d model) than the engine's.
+        """
+        collection = self.chroma_client.get_or_create_collection(
+            name="world_lore", metadata={"hnsw:space": "cosine"}, embedding_function=None
+        )
+        if collection.count() == 0:
+            return collection
+
+        stored = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        dim = len(stored[0]) if stored is not None and len(stored) else EMBEDDING_DIM
+        if dim == EMBEDDING_DIM:
+            return collection
+
+        logging.error(
+            f"Vector DB 'world_lore' holds {dim}-d embeddings but the engine produces "
+            f"{EMBEDDING_DIM}-d ones. Dropping it; run index_lore() to reindex the lore."
+        )
+        self.chroma_client.delete_collection("world_lore")
+        return self.chroma_client.get_or_create_collection(
+            name="world_lore", metadata={"hnsw:space": "cosine"}, embedding_function=None
+        )
+
+    @contextmanager
+    def _fast_bulk_mode(self):
+        """
+        Relax Chroma's SQLite durability pragmas for a bulk index build and restore them after.
+        Best effort: relies on Chroma internals and does nothing if they are unavailable.
+        """
+        conn = None
+        saved = {}
+        if self.collection:
+            try:
+                server = getattr(self.chroma_client, "_server", self.chroma_client)
+                conn = server._sysdb._conn_pool.connect()
+                for pragma, value in _BULK_PRAGMAS.items():
+                    saved[pragma] = conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+                    conn.execute(f"PRAGMA {pragma} = {value}")
+            except Exception as e:
+                logging.debug(f"Bulk SQLite pragmas not applied: {e}")
+                conn = None
+        try:
+            yield
+        finally:
+            if conn is not None:
+                for pragma, value in saved.items():
+                    try:
+                        conn.execute(f"PRAGMA {pragma} = {value}")
+                    except Exception as e:
+                        logging.warning(f"Could not restore SQLite pragma {pragma}: {e}")
+
     async def index_lore(self):
         """
         Index all markdown files in source_path into Vector DB (Chroma or Supabase).
@@ -97,90 +244,102 @@ class LoreRetriever:
         if not self.collection and not self.supabase:
             return
 
-        files = glob.glob(os.path.join(self.source_path, "**/*.md"), recursive=True)
+        # Reindexing picks up new or renamed source files
+        self._name_index = None
+
+        files = list(_iter_md(self.source_path))
 
         documents = []
         metadatas = []
         ids = []
-        embeddings = [] # For Supabase
-        chunk_count = 0
 
         if not files:
             print(f"Warning: No markdown files found in source path: {self.source_path}")
             return
 
-        for file_path in files:
-            try:
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-
-                rel_path = os.path.relpath(file_path, self.source_path)
-                chunks = [c.strip() for c in content.split("\n\n") if c.strip()]
-
-                for i, chunk in enumerate(chunks):
-                    if len(chunk) < 50: 
-                        continue 
-
-                    unique_id = f"{rel_path}_chunk_{i}" 
-                    
-                    documents.append(chunk)
-                    metadatas.append(
-                        {"source": rel_path, "filename": os.path.basename(file_path), "chunk_index": i}
-                    )
-                    ids.append(unique_id)
-                    chunk_count += 1
-                    
-                    # Generate embedding for Supabase immediately (or batch later)
-                    # For simplicity, we'll batch generate later if needed, but here we do it per chunk
-                    # to keep logic simple, though slow.
-                    # Actually, let's batch it.
+        # Read files concurrently in worker threads so the event loop stays free
+        contents = []
+        for i in range(0, len(files), READ_BATCH_SIZE):
+            contents += await asyncio.gather(
+                *(asyncio.to_thread(_read_text, p) for p in files[i : i + READ_BATCH_SIZE]),
+                return_exceptions=True,
+            )
 
-            except (IOError, OSError, UnicodeError) as e:
-                logging.error(f"Error indexing {file_path}: {e}")
+        for file_path, content in zip(files, contents):
+            if isinstance(content, Exception):
+                logging.error(f"Error indexing {file_path}: {content}")
+                continue
+
+            rel_path = os.path.relpath(file_path, self.source_path)
+            filename = os.path.basename(file_path)
+            # Build (id, doc, meta) rows per file, then extend the parallel lists once
+            rows = [
+                (f"{rel_path}_chunk_{i}", chunk, {"source": rel_path, "filename": filename, "chunk_index": i})
+                for i, chunk in enumerate(self._splitter.split_text(content))
+                if len(chunk) >= 50
+            ]
+            if rows:
+                file_ids, file_docs, file_metas = zip(*rows)
+                ids.extend(file_ids)
+                documents.extend(file_docs)
+                metadatas.extend(file_metas)
 
         if documents:
             from tqdm import tqdm
-            print(f"Found {len(files)} files. Creating and indexing {chunk_count} document chunks.")
+            print(f"Found {len(files)} files. Creating and indexing {len(documents)} document chunks.")
             
-            batch_size = 100
-            for i in tqdm(range(0, len(documents), batch_size), desc="Building Vector DB"):
-                batch_end = min(i + batch_size, len(documents))
-                batch_docs = documents[i:batch_end]
-                batch_metas = metadatas[i:batch_end]
-                batch_ids = ids[i:batch_end]
+            # Chroma ingests fastest around 250 records per call
+            batch_size = 250 if self.collection else 100
+            # Bulk build is idempotent, so SQLite durability can be relaxed while it runs
+            with self._fast_bulk_mode():
+                for i in tqdm(range(0, len(documents), batch_size), desc="Building Vector DB"):
+                    batch_end = min(i + batch_size, len(documents))
+                    batch_docs = documents[i:batch_end]
+                    batch_metas = metadatas[i:batch_end]
+                    batch_ids = ids[i:batch_end]
                 
-                if self.use_supabase and self.supabase:
-                    # Generate embeddings
-                    batch_embeddings = []
-                    for doc in batch_docs:
-                        emb = await self.engine.embed_async(doc)
-                        batch_embeddings.append(emb)
+                    if self.use_supabase and self.supabase:
+                        # Generate embeddings for the whole batch in a single request
+                        batch_embeddings = await self._embed_chunks(batch_docs)
                     
-                    # Upsert to Supabase
-                    data = []
-                    for j, doc in enumerate(batch_docs):
-                        if batch_embeddings[j]:
-                             data.append({
-                                "content": doc,
-                                "metadata": batch_metas[j],
-                                "embedding": batch_embeddings[j]
-                            })
+                        # Upsert to Supabase; ids derive from the chunk id so reindexing
+                        # overwrites rows instead of duplicating them
+                        data = [
+                            {"id": str(uuid.uuid5(uuid.NAMESPACE_URL, cid)), "content": d, "metadata": m, "embedding": e}
+                            for cid, d, m, e in zip(batch_ids, batch_docs, batch_metas, batch_embeddings)
+                            if e
+                        ]
                     
-                    if data:
-                        try:
-                            self.supabase.table("documents").upsert(data).execute()
-                        except Exception as e:
-                            print(f"Supabase Upsert Error: {e}")
-
-                elif self.collection:
-                    self.collection.upsert(
-                        documents=batch_docs,
-                        metadatas=batch_metas,
-                        ids=batch_ids,
-                    )
+                        if data:
+                            try:
+                                self.supabase.table("documents").upsert(
+                                    data, on_conflict="id", returning=ReturnMethod.minimal
+                                ).execute()
+                            except Exception as e:
+                                print(f"Supabase Upsert Error: {e}")
+
+                    elif self.collection:
+                        batch_embeddings = await self._embed_chunks(batch_docs)
+                        keep = [j for j, emb in enumerate(batch_embeddings) if emb]
+                        if keep:
+                            # IDs are unique per chunk, so add() skips upsert's read-modify-write
+                            self.collection.add(
+                                ids=[batch_ids[j] for j in keep],
+                                documents=[batch_docs[j] for j in keep],
+                                metadatas=[batch_metas[j] for j in keep],
+                                embeddings=[batch_embeddings[j] for j in keep],
+                            )
             
             logging.info(f"Indexed {len(documents)} chunks from {len(files)} files.")
 
+    async def _embed_chunks(self, docs: List[str]) -> List[List[float]]:
+        """Embed an index batch; if it still fails after retries its chunks are skipped."""
+        try:
+            return await self.engine.embed_batch_async(docs)
+        except Exception as e:
+            logging.error(f"Embedding failed, skipping {len(docs)} chunks: {e}")
+            return [[] for _ in docs]
+
     def _load_cache(self, cache_path: str = "world_primer_cache.json") -> Optional[Dict]:
         """Load cache from JSON file."""
         if not os.path.exists(cache_path):
@@ -188,8 +347,8 @@ class LoreRetriever:
             return None
 
         try:
-            with open(cache_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with open(cache_path, "rb") as f:
+                return orjson.loads(f.read())
         except (IOError, OSError, JSONDecodeError) as e:
             logging.error(f"Error loading cache '{cache_path}': {e}")
             return None
@@ -197,6 +356,8 @@ class LoreRetriever:
     async def search_lore(self, query: str, depth: str = "auto", max_files: int = 5) -> str:
         """
         Search for lore using Vector Search + Cache + Exact Match.
+        Vector search is skipped after an exact match unless the match is thinner
+        than THIN_MATCH_CHARS or depth="deep".
         """
         if not os.path.exists(self.source_path):
             return ""
@@ -206,17 +367,25 @@ class LoreRetriever:
 
         # 1. Exact Match (Highest Priority)
         exact_match = self._find_exact_match(query)
+        content = ""
         if exact_match:
-            content = self._load_full_file(exact_match)
+            content = await asyncio.to_thread(self._load_full_file, exact_match)
             results.append(
                 f"[PRIMARY CANON: {os.path.basename(exact_match)}]\n{content}"
             )
             seen_files.add(exact_match)
 
         # 2. Vector Search (Semantic)
-        if self.use_supabase and self.supabase:
+        # A substantial exact canonical hit is enough unless the caller asks for depth="deep"
+        semantic = len(content) < THIN_MATCH_CHARS or depth == "deep"
+
+        # One embedding serves whichever backend is active
+        query_embedding = None
+        if semantic and ((self.use_supabase and self.supabase) or self.collection):
+            query_embedding = await self._embed_query(query)
+
+        if semantic and self.use_supabase and self.supabase:
             try:
-                query_embedding = await self.engine.embed_async(query)
                 if query_embedding:
                     response = self.supabase.rpc(
                         "match_documents",
@@ -253,11 +422,13 @@ class LoreRetriever:
             except Exception as e:
                 print(f"Supabase search failed: {e}")
 
-        elif self.collection:
+        elif semantic and self.collection:
             try:
-                vector_results = self.collection.query(
-                    query_texts=[query], n_results=max_files
-                )
+                vector_results = {"ids": []}
+                if query_embedding:
+                    vector_results = self.collection.query(
+                        query_embeddings=[query_embedding], n_results=max_files
+                    )
 
                 if vector_results["ids"]:
                     for i, full_id in enumerate(vector_results["ids"][0]):
@@ -265,7 +436,7 @@ class LoreRetriever:
                         abs_path = os.path.join(self.source_path, rel_path)
 
                         if abs_path not in seen_files:
-                            content = self._load_full_file(abs_path)
+                            content = await asyncio.to_thread(self._load_full_file, abs_path)
                             if content:
                                 results.append(
                                     f"[SEMANTIC MATCH: {os.path.basename(abs_path)}]\n{content}"
@@ -283,34 +454,59 @@ class LoreRetriever:
 
         # 4. Vault Search (Recent Memory)
         if self.vault_root and os.path.exists(self.vault_root):
-            vault_matches = self._search_vault(query, max_results=2)
+            vault_matches = await asyncio.to_thread(self._search_vault, query, 2)
             if vault_matches:
                 results.append("\n--- GENERATED VAULT CONTENT ---")
                 results.extend(vault_matches)
 
         return "\n\n".join(results) if results else "No specific lore found."
 
+    def _build_name_index(self) -> Dict[str, str]:
+        """Map every lowercase filename under source_path to its path (first hit wins)."""
+        index = {}
+        stack = [self.source_path]
+        while stack:
+            root = stack.pop()
+            try:
+                with os.scandir(root) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            stack.append(entry.path)
+                        else:
+                            index.setdefault(entry.name.lower(), entry.path)
+            except OSError:
+                continue
+        return index
+
+    async def _embed_query(self, query: str) -> List[float]:
+        """Embed a search query once and reuse it for repeated queries."""
+        embedding = self._query_embeddings.get(query)
+        if embedding is not None:
+            self._query_embeddings.move_to_end(query)
+            return embedding
+
+        embedding = await self.engine.embed_async(query)
+        if embedding:
+            self._query_embeddings[query] = embedding
+            if len(self._query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_embeddings.popitem(last=False)
+        return embedding
+
     def _find_exact_match(self, entity_name: str) -> Optional[str]:
         """Find source file with exact name match."""
-        safe_name = entity_name.replace(" ", "_") + ".md"
-        # Search recursively
-        for root, dirs, files in os.walk(self.source_path):
-            for file in files:
-                if file.lower() == safe_name.lower():
-                    return os.path.join(root, file)
+        if self._name_index is None:
+            self._name_index = self._build_name_index()
 
+        safe_name = entity_name.replace(" ", "_") + ".md"
         # Try hyphen (Added in previous review)
         safe_name_hyphen = entity_name.replace(" ", "-") + ".md"
-        for root, dirs, files in os.walk(self.source_path):
-            for file in files:
-                if file.lower() == safe_name_hyphen.lower():
-                    return os.path.join(root, file)
-        return None
+        return self._name_index.get(safe_name.lower()) or self._name_index.get(
+            safe_name_hyphen.lower()
+        )
 
     def _load_full_file(self, file_path: str) -> str:
         try:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                return f.read()
+            return _read_cache.read(file_path)
         except (IOError, OSError, UnicodeError) as e:
             logging.warning(f"Could not load full file '{file_path}': {e}")
             return ""
@@ -322,6 +518,9 @@ class LoreRetriever:
             return results
 
         # Simple walk and search
+        needle = entity_name.lower()
+        # bytes.lower() only folds ASCII, so non-ASCII names keep the str path
+        raw_needle = needle.encode("utf-8") if needle.isascii() else None
         count = 0
         for root, dirs, files in os.walk(self.vault_root):
             dirs[:] = [d for d in dirs if not d.startswith((".", "_"))]
@@ -333,16 +532,27 @@ class LoreRetriever:
 
                 try:
                     path = os.path.join(root, file)
-                    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                        content = f.read()
-
-                    if entity_name.lower() in content.lower():
-                        idx = content.lower().find(entity_name.lower())
+                    if raw_needle is not None:
+                        with open(path, "rb") as f:
+                            raw = f.read()
+                        idx = raw.lower().find(raw_needle)
+                        if idx < 0:
+                            continue
+                        start = max(0, idx - 150)
+                        end = min(len(raw), idx + 150 + len(raw_needle))
+                        # Decode only the snippet window, not the whole file
+                        snippet = raw[start:end].decode("utf-8", errors="ignore")
+                        snippet = snippet.replace("\r\n", "\n").strip()
+                    else:
+                        content = _read_text(path)
+                        idx = content.lower().find(needle)
+                        if idx < 0:
+                            continue
                         start = max(0, idx - 150)
                         end = min(len(content), idx + 150 + len(entity_name))
                         snippet = content[start:end].strip()
-                        results.append(f"[VAULT: {file}]\n...{snippet}...")
-                        count += 1
+                    results.append(f"[VAULT: {file}]\n...{snippet}...")
+                    count += 1
                 except (IOError, OSError, UnicodeError) as e:
                     logging.warning(f"Skipping vault file {file} due to error: {e}")
                     continue
@@ -1,6 +1,18 @@
 import os
+import re
+from typing import Optional
 from ruamel.yaml import YAML
 
+# Top-level block-style tags list: "tags:\n  - a\n  - b\n"
+_TAGS_BLOCK_RE = re.compile(r"^tags:[ \t]*\n((?:[ \t]+-[ \t]+[^\n]*\n)+)", re.MULTILINE)
+# Tags that YAML reads back as the same plain string
+_PLAIN_TAG_RE = re.compile(r"[A-Za-z_][\w/.-]*")
+_YAML_KEYWORDS = {"true", "false", "null"}
+
+
+def _is_plain_tag(value: str) -> bool:
+    return bool(_PLAIN_TAG_RE.fullmatch(value)) and value.lower() not in _YAML_KEYWORDS
+
 
 class MetadataHandler:
     """
@@ -42,6 +54,15 @@ class MetadataHandler:
             else:
                 frontmatter_str = parts[1]
                 body = parts[2]
+
+                # Fast path: splice into an existing simple tags list, no YAML round trip
+                spliced = self._splice_tags(frontmatter_str, new_tags_list)
+                if spliced is not None:
+                    if spliced != frontmatter_str:
+                        with open(file_path, "w", encoding="utf-8") as f:
+                            f.write("---\n" + spliced + "---\n" + body)
+                    return
+
                 frontmatter = self.yaml.load(frontmatter_str) or {}
 
         # Update tags
@@ -66,3 +87,37 @@ class MetadataHandler:
                 self.yaml.dump(frontmatter, f)
                 f.write("---\n")
                 f.write(body)
+
+    def _splice_tags(self, frontmatter_str: str, new_tags_list: list[str]) -> Optional[str]:
+        """
+        Appends tags to an existing block-style tags list with plain string editing.
+        Returns the updated frontmatter, or None if the ruamel path is needed.
+        """
+        match = _TAGS_BLOCK_RE.search(frontmatter_str)
+        if not match:
+            return None
+
+        indent = None
+        current_tags = []
+        for line in match.group(1).splitlines():
+            item_indent, _, value = line.partition("-")
+            value = value.strip()
+            if not _is_plain_tag(value) or indent not in (None, item_indent):
+                return None
+            indent = item_indent
+            current_tags.append(value)
+
+        added = []
+        for tag in new_tags_list:
+            if tag in current_tags or tag in added:
+                continue
+            if not _is_plain_tag(tag):
+                return None
+            added.append(tag)
+
+        if not added:
+            return frontmatter_str
+
+        end = match.end(1)
+        insert = "".join(f"{indent}- {tag}\n" for tag in added)
+        return frontmatter_str[:end] + insert + frontmatter_str[end:]
@@ -2,6 +2,8 @@
 Centralized prompts for the Vault Architect - Simulation Engine Configuration.
 """
 
+from functools import lru_cache
+
 SCANNER_INSTRUCTION = """
 You are the Entity Scanner. Extract all proper nouns (people, places, organizations, items, spells, concepts) from the provided text.
 
@@ -246,59 +248,42 @@ FORMAT: Use markdown callouts **exactly** as shown below. Use them liberally to
 """
 
 
+# Persona rules in priority order: persona -> keywords per lowercased field
+_PERSONA_RULES = (
+    ("UNMAKER", {"category": ("cult",), "name": ("void", "cult"), "tags": ("void",)}),
+    ("BREAKER", {"category": ("tech",), "name": ("alerion",), "tags": ("breaker",)}),
+    ("HIEROPHANT", {"category": ("bastion",), "name": ("god", "temple"), "tags": ("hierophant",)}),
+    ("WARDEN", {"category": ("nature",), "name": ("elf", "forest"), "tags": ("warden",)}),
+)
+# Tech entities named like these get the Architect voice (ancient tech)
+_ANCIENT_TECH = ("machine", "construct", "artifact")
+
+
 # Helper function for persona selection
-def select_persona(category: str, entity_name: str, tags: list = None) -> str:
+@lru_cache(maxsize=4096)
+def select_persona(category: str, entity_name: str, tags: tuple = ()) -> str:
     """
     Infer the appropriate narrative persona based on entity context.
 
     Args:
         category: The folder/category of the entity
         entity_name: Name of the entity
-        tags: Optional list of tags for fine-tuning
+        tags: Optional tuple of tags for fine-tuning (hashable, for the cache)
 
     Returns:
         Key for PERSONA_LIBRARY
     """
-    cat_lower = category.lower()
-    name_lower = entity_name.lower()
-    tags_str = " ".join(tags).lower() if tags else ""
-
-    # Void/Cult entities
-    if (
-        "void" in name_lower
-        or "void" in tags_str
-        or "cult" in cat_lower
-        or "cult" in name_lower
-    ):
-        return "UNMAKER"
-
-    # Tech/Industrial entities
-    if "tech" in cat_lower or "alerion" in name_lower or "breaker" in tags_str:
-        if (
-            "machine" in name_lower
-            or "construct" in name_lower
-            or "artifact" in name_lower
-        ):
-            return "ARCHITECT"  # Ancient tech gets Architect voice
-        return "BREAKER"
-
-    # Religious/Divine entities
-    if (
-        "bastion" in cat_lower
-        or "god" in name_lower
-        or "hierophant" in tags_str
-        or "temple" in name_lower
-    ):
-        return "HIEROPHANT"
-
-    # Nature/Elven entities
-    if (
-        "elf" in name_lower
-        or "nature" in cat_lower
-        or "warden" in tags_str
-        or "forest" in name_lower
-    ):
-        return "WARDEN"
+    fields = {
+        "category": category.lower(),
+        "name": entity_name.lower(),
+        "tags": " ".join(tags).lower() if tags else "",
+    }
+
+    for persona, rules in _PERSONA_RULES:
+        if any(kw in fields[field] for field, kws in rules.items() for kw in kws):
+            if persona == "BREAKER" and any(kw in fields["name"] for kw in _ANCIENT_TECH):
+                return "ARCHITECT"
+            return persona
 
     # Default to neutral chronicler
-    return "CHRONICLER"
\ No newline at end of file
+    return "CHRONICLER"
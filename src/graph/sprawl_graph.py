@@ -2,9 +2,13 @@ import os
 import json
 import re
 import glob
-from typing import TypedDict, List, Set
+import asyncio
+import hashlib
+from collections import deque
+from typing import Deque, TypedDict, List, Set
+import orjson
 from langgraph.graph import StateGraph, END
-from src.core.cognitive_engine import CognitiveEngine
+from src.core.cognitive_engine import CognitiveEngine, is_cache_error
 from src.utils.security import safe_write_file
 from src.core.metadata_handler import MetadataHandler
 from src.core.lore_retriever import LoreRetriever
@@ -58,38 +62,94 @@ FOLDER_MAP = {
     "Technology": "07_Items_and_Tech/Breaker_and_Alerion_Tech",
 }
 
+# Whole-word FOLDER_MAP key in an entity name (e.g. "History of the Rift") skips the LLM
+_CATEGORY_KEY_RE = re.compile(r"\b(" + "|".join(FOLDER_MAP) + r")\b", re.IGNORECASE)
+_CATEGORY_KEYS = {key.lower(): key for key in FOLDER_MAP}
+
+_UNDERSCORE_TO_SPACE = str.maketrans("_", " ")
+
+_FENCE_OPEN = re.compile(r"^```(?:markdown|yaml|json)?\s*\n", re.MULTILINE)
+_FENCE_CLOSE = re.compile(r"\n```\s*$", re.MULTILINE)
+
+# Scanned-entity keywords -> director tier
+_SCAN_TIERS = {"continent": 1, "region": 2, "city": 3, "town": 4}
+_SCAN_TIER_RE = re.compile("|".join(_SCAN_TIERS))
+
+# Files shorter than this are not sent to the scanner LLM
+SCANNER_MIN_CHARS = 200
+# Vault notes smaller than this are reported as stubs
+STUB_MAX_BYTES = 800
+# Entities per bulk classification prompt
+CLASSIFY_BATCH_SIZE = 100
+
+_STYLE_INSTRUCTION = "Use Obsidian Callouts. Wikilink proper nouns."
+
+# Built once at import: persona key -> dual-truth block / full static writer head
+_DUAL_TRUTH_BY_PERSONA = {
+    key: f"""
+### PART 1: THE PUBLIC MYTH
+{voice}
+Write from the in-world perspective.
+
+### PART 2: THE GM'S TRUTH
+{GM_OMNISCIENT}
+Reveal the mechanical reality and secrets.
+"""
+    for key, voice in PERSONA_LIBRARY.items()
+}
+_STATIC_HEAD_BY_PERSONA = {
+    key: f"{WRITER_PERSONA}\n{dual_truth}\n{_STYLE_INSTRUCTION}"
+    for key, dual_truth in _DUAL_TRUTH_BY_PERSONA.items()
+}
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+_FOUNDATION_DENSITY = (3500, "Full Earth-Level Simulation")
+_MAJOR_DENSITY = (2500, "Deep Systemic Simulation")
+_STANDARD_DENSITY = (1500, "Focused Simulation")
+_MICRO_DENSITY = (1200, "Concise Functional Simulation")
+
+_DENSITY_BY_TIER = {
+    1: ("TIER 1 FOUNDATION", *_FOUNDATION_DENSITY),
+    2: ("TIER 2-3 MAJOR", *_MAJOR_DENSITY),
+    3: ("TIER 2-3 MAJOR", *_MAJOR_DENSITY),
+    4: ("TIER 4-5 STANDARD", *_STANDARD_DENSITY),
+    5: ("TIER 4-5 STANDARD", *_STANDARD_DENSITY),
+}
+_DENSITY_MICRO_TIER = ("TIER 6+ MICRO", *_MICRO_DENSITY)
+
+_DENSITY_BY_CATEGORY = {
+    "01_The_Meta_Truths": ("MACRO (Foundation)", *_FOUNDATION_DENSITY),
+    "02_Cosmology_and_Magic/The_Six_Axioms": ("MACRO (Foundation)", *_FOUNDATION_DENSITY),
+    "04_The_Atlas/Cities": ("MACRO (Major)", *_MAJOR_DENSITY),
+    "03_Factions_and_Politics": ("MACRO (Major)", *_MAJOR_DENSITY),
+    "05_People_and_Biology/NPCs": ("STANDARD", *_STANDARD_DENSITY),
+    "04_The_Atlas/Dungeons_and_Ruins": ("STANDARD", *_STANDARD_DENSITY),
+}
+_DENSITY_MICRO_CATEGORY = ("MICRO", *_MICRO_DENSITY)
+
 
 def get_density_settings(category: str, tier: int = None):
     """
     Returns (Entity_Type, Target_Word_Count, Description) based on hierarchy tier.
     """
     if tier is not None:
-        if tier == 1:
-            return "TIER 1 FOUNDATION", 3500, "Full Earth-Level Simulation"
-        elif tier in [2, 3]:
-            return "TIER 2-3 MAJOR", 2500, "Deep Systemic Simulation"
-        elif tier in [4, 5]:
-            return "TIER 4-5 STANDARD", 1500, "Focused Simulation"
-        else:
-            return "TIER 6+ MICRO", 1200, "Concise Functional Simulation"
-
-    if category in ["01_The_Meta_Truths", "02_Cosmology_and_Magic/The_Six_Axioms"]:
-        return "MACRO (Foundation)", 3500, "Full Earth-Level Simulation"
-    elif category in ["04_The_Atlas/Cities", "03_Factions_and_Politics"]:
-        return "MACRO (Major)", 2500, "Deep Systemic Simulation"
-    elif category in ["05_People_and_Biology/NPCs", "04_The_Atlas/Dungeons_and_Ruins"]:
-        return "STANDARD", 1500, "Focused Simulation"
-    else:
-        return "MICRO", 1200, "Concise Functional Simulation"
+        return _DENSITY_BY_TIER.get(tier, _DENSITY_MICRO_TIER)
+    return _DENSITY_BY_CATEGORY.get(category, _DENSITY_MICRO_CATEGORY)
 
 
 class AgentState(TypedDict):
     current_file_path: str
-    sprawl_queue: List[str]
-    visited_entities: Set[str]
-    recursion_depth: int
+    sprawl_queue: Deque[str]  # consumed from the left with popleft()
+    visited_entities: Set[str]  # checked per scanned entity, so it must stay a set
+    recursion_depth: int  # entities handed out by the dispatcher
     root_dir: str
     generated_files: List[str]
+    generated_files_set: Set[str]  # mirror of generated_files for membership checks
     latest_rag_count: int
     vault_glossary: List[str]
     world_primer: str
@@ -113,10 +173,21 @@ class SprawlGraph:
         self.registry = EntityRegistry(root_dir)
         self.director = ContinuityDirector(root_dir)
         self.editor = EditorialDirector()
-        self.consistency = ConsistencyController()
-        self.lore_retriever = LoreRetriever(self.source_dir, vault_root=self.root_dir)
+        # One engine means one HTTP/2 connection pool, embedding batcher and token budget
+        self.consistency = ConsistencyController(engine=self.engine)
+        self.lore_retriever = LoreRetriever(
+            self.source_dir, vault_root=self.root_dir, engine=self.engine
+        )
         self.cache_active = False
         self.default_system_instruction = None
+        self._category_cache: dict[str, str] = {}  # entity -> FOLDER_MAP folder
+        self._vault_index: dict[str, str] | None = None  # lowercase filename -> path
+        self._vault_glossary: List[str] = []
+        self._vault_stubs: List[str] = []
+        self._lore_cache: dict[str, str] = {}  # entity -> search_lore result
+        self._lore_locks: dict[str, asyncio.Lock] = {}
+        self._prefetch_tasks: dict[str, asyncio.Task] = {}
+        self._scanned_hashes: set[str] = set()  # contents already sent to the scanner
 
         self.workflow = StateGraph(AgentState)
         self.workflow.add_node("architect", self.architect_node)
@@ -140,6 +211,25 @@ class SprawlGraph:
 
         self.app = self.workflow.compile(checkpointer=checkpointer)
 
+    async def aclose(self):
+        """Shut down after a run: stop prefetches, persist the registry and queue, close the engine."""
+        self._cancel_prefetch()
+        self.registry.close()
+        self.director.close()
+        await self.engine.aclose()
+
+    async def astream(self, state: AgentState, config: dict = None):
+        """
+        Stream the graph run. Buffered registrations and queue updates are
+        written when the run ends, including when a node raises.
+        """
+        try:
+            async for event in self.app.astream(state, config=config):
+                yield event
+        finally:
+            self.registry.flush()
+            self.director.flush()
+
     def initialize_cache(self, content: str):
         """Initialize Gemini Context Caching with the World Primer."""
         print(f"Initializing Cache with {len(content)} chars of World Primer...")
@@ -157,8 +247,8 @@ class SprawlGraph:
             return "Meridian world (cache not found)"
         
         try:
-            with open(cache_path, "r", encoding="utf-8") as f:
-                cache = json.load(f)
+            with open(cache_path, "rb") as f:
+                cache = orjson.loads(f.read())
             
             # Build comprehensive primer from all cached summaries
             primer_parts = ["# Meridian World Primer\n"]
@@ -169,17 +259,77 @@ class SprawlGraph:
                 
                 if key_points:
                     # Use basename for cleaner context
-                    name = os.path.basename(file_path).replace(".md", "").replace("_", " ")
-                    primer_parts.append(f"\n## {name} ({category})")
-                    for point in key_points:
-                        primer_parts.append(f"- {point}")
+                    name = os.path.basename(file_path)
+                    if name.endswith(".md"):
+                        name = name[:-3]
+                    primer_parts.append(f"\n## {name.translate(_UNDERSCORE_TO_SPACE)} ({category})")
+                    primer_parts.extend(f"- {point}" for point in key_points)
             
             return "\n".join(primer_parts)
         except Exception as e:
             print(f"Warning: Failed to load world primer cache: {e}")
             return "Meridian world (cache load failed)"
 
+    def _scan_vault(self):
+        """
+        One os.scandir pass over root_dir that builds the filename index (for
+        find_file), the glossary and the stub list, instead of a walk per use.
+        """
+        index, glossary, stubs = {}, [], []
+        stack = [(self.root_dir, False)]
+        while stack:
+            path, in_source = stack.pop()
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir():
+                    # Like os.walk, symlinked directories are not descended into
+                    if not name.startswith((".", "_")) and not entry.is_symlink():
+                        is_source = "Source FIles" in name or "Source Files" in name
+                        stack.append((entry.path, in_source or is_source))
+                    continue
+                if not in_source:
+                    index.setdefault(name.lower(), entry.path)
+                if name.endswith(".md"):
+                    glossary.append(name.replace(".md", "").replace("_", " "))
+                    if not in_source:
+                        try:
+                            # Cached on the DirEntry, no second stat per file
+                            if entry.stat().st_size < STUB_MAX_BYTES:
+                                stubs.append(name.replace(".md", "").replace("_", " "))
+                        except OSError:
+                            pass
+        self._vault_index = index
+        self._vault_glossary = glossary
+        self._vault_stubs = stubs
+
+    def _record_written_file(self, path: str, content: str):
+        """Keep the vault index, glossary and stub list current after a write instead of rescanning."""
+        if self._vault_index is None:
+            return
+        name = os.path.basename(path)
+        title = name.replace(".md", "").replace("_", " ")
+        if name.lower() not in self._vault_index:
+            self._vault_glossary.append(title)
+        self._vault_index[name.lower()] = path
+
+        if name.endswith(".md"):
+            is_stub = len(content.encode("utf-8")) < STUB_MAX_BYTES
+            if is_stub and title not in self._vault_stubs:
+                self._vault_stubs.append(title)
+            elif not is_stub and title in self._vault_stubs:
+                self._vault_stubs.remove(title)
+
     def find_file(self, filename: str, search_path: str) -> str | None:
+        if search_path == self.root_dir:
+            if self._vault_index is None:
+                self._scan_vault()
+            return self._vault_index.get(filename.lower())
+
         target_lower = filename.lower()
         for root, dirs, files in os.walk(search_path):
             # Exclude hidden dirs and Source Files
@@ -196,45 +346,128 @@ class SprawlGraph:
         return None
 
     def scan_for_stubs(self) -> List[str]:
-        stubs = []
-        for root, dirs, files in os.walk(self.root_dir):
-            dirs[:] = [
-                d
-                for d in dirs
-                if not d.startswith((".", "_")) and "Source FIles" not in d
-            ]
-            for file in files:
-                if file.endswith(".md"):
-                    path = os.path.join(root, file)
-                    try:
-                        if os.path.getsize(path) < 800:
-                            stubs.append(file.replace(".md", "").replace("_", " "))
-                    except OSError:
-                        pass
-        return stubs
+        if self._vault_index is None:
+            self._scan_vault()
+        return list(self._vault_stubs)
 
     def build_vault_glossary(self) -> List[str]:
-        glossary = []
-        for root, dirs, files in os.walk(self.root_dir):
-            dirs[:] = [d for d in dirs if not d.startswith((".", "_"))]
-            for file in files:
-                if file.endswith(".md"):
-                    glossary.append(file.replace(".md", "").replace("_", " "))
-        return glossary
+        if self._vault_index is None:
+            self._scan_vault()
+        return list(self._vault_glossary)
+
+    async def _get_lore(self, entity: str) -> str:
+        """
+        search_lore once per entity, shared by the outliner, the creator and
+        every revision pass. The default depth skips the embedding and vector
+        query when the entity has a substantial canon file of its own.
+        """
+        if entity in self._lore_cache:
+            return self._lore_cache[entity]
+        lock = self._lore_locks.setdefault(entity, asyncio.Lock())
+        async with lock:
+            if entity not in self._lore_cache:
+                self._lore_cache[entity] = await self.lore_retriever.search_lore(entity)
+        return self._lore_cache[entity]
+
+    async def _prefetch(self, entity: str):
+        await asyncio.gather(
+            self.classify_entity(entity), self._get_lore(entity), return_exceptions=True
+        )
+
+    def _prefetch_upcoming(self, queue: Deque[str]):
+        """
+        Queued entities don't depend on each other until the scanner runs, so their
+        classification and lore retrieval are started in the background while the
+        head of the queue is being written. SPRAWL_FANOUT bounds how far ahead.
+        """
+        fanout = int(os.environ.get("SPRAWL_FANOUT", 8))
+        for entity in list(queue)[1:fanout]:
+            if entity in self._lore_cache or entity in self._prefetch_tasks:
+                continue
+            task = asyncio.create_task(self._prefetch(entity))
+            task.add_done_callback(lambda _, e=entity: self._prefetch_tasks.pop(e, None))
+            self._prefetch_tasks[entity] = task
+
+    def _cancel_prefetch(self):
+        for task in list(self._prefetch_tasks.values()):
+            task.cancel()
+        self._prefetch_tasks.clear()
+
+    def _classify_by_rule(self, entity: str) -> str | None:
+        match = _CATEGORY_KEY_RE.search(entity)
+        if match:
+            return FOLDER_MAP[_CATEGORY_KEYS[match.group(1).lower()]]
+        return None
+
+    async def classify_entities_bulk(self, entities: list[str]) -> dict[str, str]:
+        """
+        Classify many entities with one LLM call per CLASSIFY_BATCH_SIZE.
+        Results are kept in self._category_cache for classify_entity.
+        """
+        pending = []
+        for entity in entities:
+            if entity in self._category_cache:
+                continue
+            folder = self._classify_by_rule(entity)
+            if folder:
+                self._category_cache[entity] = folder
+            else:
+                pending.append(entity)
+
+        keys = list(FOLDER_MAP.keys())
+
+        async def classify_batch(batch: list[str]):
+            prompt = (
+                f"Classify each entity into one of: {keys}.\n"
+                f"Return ONLY a JSON object mapping each entity name to its key.\n"
+                f"Entities: {json.dumps(batch)}"
+            )
+            try:
+                response = await self.engine.generate_async(
+                    prompt, response_mime_type="application/json"
+                )
+                result = orjson.loads(response)
+                for entity in batch:
+                    key = str(result.get(entity, "")).strip()
+                    if key in FOLDER_MAP:
+                        self._category_cache[entity] = FOLDER_MAP[key]
+            except Exception as e:
+                print(f"Bulk classification failed: {e}")
+
+        await asyncio.gather(
+            *(
+                classify_batch(pending[i : i + CLASSIFY_BATCH_SIZE])
+                for i in range(0, len(pending), CLASSIFY_BATCH_SIZE)
+            )
+        )
+        return {e: self._category_cache[e] for e in entities if e in self._category_cache}
 
     async def classify_entity(self, entity: str) -> str:
+        folder = self._category_cache.get(entity) or self._classify_by_rule(entity)
+        if folder:
+            return folder
+
         keys = list(FOLDER_MAP.keys())
         prompt = f"Classify '{entity}' into one of: {keys}. Return ONLY the key name."
         try:
             key = await self.engine.generate_async(prompt)
             key = key.strip().replace("`", "").replace('"', "")
-            return FOLDER_MAP.get(key, "Unsorted")
+            folder = FOLDER_MAP.get(key, "Unsorted")
+            self._category_cache[entity] = folder
+            return folder
         except:
             return "Unsorted"
 
     async def architect_node(self, state: AgentState) -> AgentState:
         print("[ARCHITECT] Initializing...")
 
+        # Callers may seed the state with plain lists; normalise once at the entry node
+        if not isinstance(state["sprawl_queue"], deque):
+            state["sprawl_queue"] = deque(state["sprawl_queue"])
+        if not isinstance(state["visited_entities"], set):
+            state["visited_entities"] = set(state["visited_entities"])
+        state["generated_files_set"] = set(state.get("generated_files", []))
+
         search_pattern = os.path.join(self.source_dir, "**/*Tiered Hierarchy*.md")
         files = glob.glob(search_pattern, recursive=True)
 
@@ -242,7 +475,7 @@ class SprawlGraph:
             return state
 
         parser = HierarchyParser(files[0])
-        ordered_entities = parser.parse()
+        ordered_entities = await asyncio.to_thread(parser.parse)
 
         if not ordered_entities:
             return state
@@ -251,8 +484,10 @@ class SprawlGraph:
         for item in ordered_entities:
             name = item["name"]
             
-            # Check if file exists on disk (Primary Truth)
-            file_exists = self.find_file(name + ".md", self.root_dir)
+            # Check if file exists on disk (Primary Truth); the creator writes underscored names
+            file_exists = self.find_file(name + ".md", self.root_dir) or self.find_file(
+                name.replace(" ", "_") + ".md", self.root_dir
+            )
             
             # Only skip if file actually exists
             if file_exists:
@@ -264,12 +499,16 @@ class SprawlGraph:
 
         for item in queue_items:
             state["sprawl_queue"].append(item["name"])
-            self.registry.register_entity(
-                name=item["name"],
-                category=item["category"],
-                tier=item["tier"],
-                status="planned",
-            )
+        # One registry write for the whole plan instead of one per entity
+        self.registry.register_bulk(
+            [
+                {"name": item["name"], "category": item["category"], "tier": item["tier"], "status": "planned"}
+                for item in queue_items
+            ]
+        )
+
+        # Classify the whole queue up front so the outliner does not pay one round trip per entity
+        await self.classify_entities_bulk([item["name"] for item in queue_items])
 
         # Load world primer from cache in the PROJECT directory (not vault)
         # The cache file is always in the same directory as this script
@@ -289,11 +528,17 @@ class SprawlGraph:
         if not os.path.exists(file_path):
             return state
 
-        all_entities = []
+        unique_entities: set[str] = set()
         if not os.path.isdir(file_path):
             with open(file_path, "r", encoding="utf-8") as f:
                 content = f.read()
 
+            # Stubs have nothing to extract; unchanged files were already scanned this run
+            digest = hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+            if len(content) < SCANNER_MIN_CHARS or digest in self._scanned_hashes:
+                return state
+            self._scanned_hashes.add(digest)
+
             prompt = (
                 f"{SCANNER_INSTRUCTION}\nReturn JSON list.\nText: {content[:15000]}"
             )
@@ -301,46 +546,45 @@ class SprawlGraph:
                 response = await self.engine.generate_async(
                     prompt, response_mime_type="application/json"
                 )
-                new_entities = json.loads(response)
+                new_entities = orjson.loads(response)
                 for entity in new_entities:
                     if isinstance(entity, str) and entity.strip():
-                        all_entities.append(entity.strip())
+                        unique_entities.add(entity.strip())
             except:
                 pass
 
-        unique_entities = list(set(all_entities))
         for entity in unique_entities:
             if (
                 entity
                 and entity not in state["visited_entities"]
                 and not self.registry.is_complete(entity)
             ):
-                tier = 10  # Default LOW priority for scanned entities
-                lower_name = entity.lower()
-                if "continent" in lower_name:
-                    tier = 1
-                elif "region" in lower_name:
-                    tier = 2
-                elif "city" in lower_name:
-                    tier = 3
-                elif "town" in lower_name:
-                    tier = 4
+                # Default LOW priority for scanned entities; the broadest keyword wins
+                tier = min(
+                    (_SCAN_TIERS[k] for k in _SCAN_TIER_RE.findall(entity.lower())),
+                    default=10,
+                )
 
                 self.director.add_entity(entity, source="Scanner", tier=tier)
 
         return state
 
     def dispatcher_node(self, state: AgentState) -> AgentState:
-        state["recursion_depth"] = state.get("recursion_depth", 0) + 1
+        # Revisions loop editor -> creator directly, so only a pass that hands out
+        # an entity counts toward MAX_RECURSION.
         if not state["sprawl_queue"]:
             next_entity = self.director.get_next_entity()
             if next_entity:
                 state["sprawl_queue"].append(next_entity)
+        if state["sprawl_queue"]:
+            state["recursion_depth"] = state.get("recursion_depth", 0) + 1
         return state
 
     def dispatch_logic(self, state: AgentState) -> str:
         max_depth = int(os.environ.get("MAX_RECURSION", 50))
         if state["recursion_depth"] >= max_depth or not state["sprawl_queue"]:
+            self._cancel_prefetch()
+            self.registry.flush()
             return "end"
         return "create"
 
@@ -349,17 +593,18 @@ class SprawlGraph:
             return state
 
         entity = state["sprawl_queue"][0]
+        self._prefetch_upcoming(state["sprawl_queue"])
         category = await self.classify_entity(entity)
         state["current_entity_category"] = category
 
         entity_tier = None
         if entity in self.registry.data["entities"]:
-            entity_tier = self.registry.data["entities"][entity]["tier"]
+            entity_tier = self.registry.data["entities"][entity].tier
 
         entity_type, target_count, desc = get_density_settings(category, entity_tier)
         state["current_density_settings"] = (entity_type, target_count, desc)
 
-        lore_context = await self.lore_retriever.search_lore(entity)
+        lore_context = await self._get_lore(entity)
         prompt = f"{OUTLINER_INSTRUCTION}\nEntity: {entity}\nTarget: {target_count} words\nContext: {lore_context[:500]}"
 
         try:
@@ -377,7 +622,7 @@ class SprawlGraph:
                     prompt, response_mime_type="application/json"
                 )
             state["entity_outline"] = response
-            state["simulation_mode"] = json.loads(response).get(
+            state["simulation_mode"] = orjson.loads(response).get(
                 "Simulation_Mode", "FULL"
             )
         except:
@@ -422,7 +667,7 @@ class SprawlGraph:
                 entity = state.get("current_entity")
                 if entity:
                     category = state.get("current_entity_category", "Unsorted")
-                    self.registry.register_entity(
+                    self.registry.register_entity_buffered(
                         name=entity, category=category, tier=5, status="complete", path=latest_file
                     )
                     self.director.mark_complete(entity)
@@ -445,13 +690,13 @@ class SprawlGraph:
         if not entity:
             if not state["sprawl_queue"]:
                 return state
-            entity = state["sprawl_queue"].pop(0)
+            entity = state["sprawl_queue"].popleft()
             state["current_entity"] = entity
             
         print(f"✍️  [CREATOR] Writing content for '{entity}' (Attempt {state.get('critique_count', 0) + 1})...")
 
         safe_filename = entity.replace(" ", "_") + ".md"
-        lore_context = await self.lore_retriever.search_lore(entity)
+        lore_context = await self._get_lore(entity)
         existing_path = self.find_file(safe_filename, self.root_dir)
 
         category = state.get("current_entity_category", "Unsorted")
@@ -459,21 +704,15 @@ class SprawlGraph:
         gm_mode_enabled = os.environ.get("GM_MODE", "True").lower() == "true"
 
         persona_key = select_persona(category, entity)
-        public_voice = PERSONA_LIBRARY.get(persona_key, PERSONA_LIBRARY["CHRONICLER"])
-
-        style_instruction = "Use Obsidian Callouts. Wikilink proper nouns."
-
-        dual_truth_instruction = f"""
-### PART 1: THE PUBLIC MYTH
-{public_voice}
-Write from the in-world perspective.
 
-### PART 2: THE GM'S TRUTH
-{GM_OMNISCIENT}
-Reveal the mechanical reality and secrets.
-        """
+        # Static head first: it is identical for every entity with this persona,
+        # so provider prefix/context caches can reuse it. Dynamic content follows.
+        static_head = _STATIC_HEAD_BY_PERSONA.get(
+            persona_key, _STATIC_HEAD_BY_PERSONA["CHRONICLER"]
+        )
         
-        # Inject Critique if present
+        # Inject Critique if present. It always goes last, so revision passes share
+        # the whole preceding prompt as a cacheable prefix.
         critique_notes = state.get("critique_notes", "")
         critique_instruction = ""
         if critique_notes and "APPROVED" not in critique_notes:
@@ -485,14 +724,12 @@ Reveal the mechanical reality and secrets.
 
         if existing_path:
             try:
-                with open(existing_path, "r", encoding="utf-8") as f:
-                    old_content = f.read()
+                old_content = await asyncio.to_thread(_read_text, existing_path)
 
                 prompt = f"""REWRITE "{entity}".
-                OLD CONTENT: {old_content}
                 OUTLINE: {entity_outline}
+                OLD CONTENT: {old_content}
                 CONTEXT: {lore_context}
-                {dual_truth_instruction}
                 {critique_instruction}"""
                 target_path = existing_path
             except Exception as e:
@@ -502,35 +739,44 @@ Reveal the mechanical reality and secrets.
             prompt = f"""Write NEW entry "{entity}".
             OUTLINE: {entity_outline}
             CONTEXT: {lore_context}
-            {dual_truth_instruction}
-            {critique_instruction}
             
             CRITICAL INSTRUCTION:
             - Write ONLY the article content.
             - DO NOT output a list of files.
             - DO NOT output the World Primer or context.
             - DO NOT append a 'GENERATED VAULT CONTENT' section.
-            """
+            {critique_instruction}"""
             target_path = os.path.join(category, safe_filename)
 
         if self.cache_active:
+            # The World Primer owns the context cache, so the static head leads the prompt
             full_prompt = (
-                f"SYSTEM INSTRUCTION: {WRITER_PERSONA}\n\nUSER PROMPT:\n{prompt}"
+                f"SYSTEM INSTRUCTION: {static_head}\n\nUSER PROMPT:\n{prompt}"
             )
             content = await self.engine.generate_async(
                 full_prompt, system_instruction=None
             )
         else:
-            content = await self.engine.generate_async(
-                prompt, system_instruction=WRITER_PERSONA
-            )
+            # Looked up per call: the engine renews caches before their TTL runs out
+            cache_name = await self.engine.get_or_create_cache_async(static_head)
+            content = None
+            if cache_name:
+                try:
+                    content = await self.engine.generate_async(prompt, cached_content=cache_name)
+                except Exception as e:
+                    if not is_cache_error(e):
+                        raise
+                    # Expired or deleted on the server: drop it and send the head inline
+                    self.engine.forget_cache(static_head)
+            if content is None:
+                content = await self.engine.generate_async(
+                    prompt, system_instruction=static_head
+                )
 
         # CRITICAL SAFETY: Strip code fences if LLM disobeys "no code fence" instruction
 
-        content = re.sub(
-            r"^```(?:markdown|yaml|json)?\s*\n", "", content, flags=re.MULTILINE
-        )
-        content = re.sub(r"\n```\s*$", "", content, flags=re.MULTILINE)
+        content = _FENCE_OPEN.sub("", content)
+        content = _FENCE_CLOSE.sub("", content)
         content = content.strip()
 
         # VALIDATION: Ensure YAML frontmatter compliance
@@ -539,11 +785,16 @@ Reveal the mechanical reality and secrets.
                 f"   ⚠️  WARNING: Output for '{entity}' doesn't start with YAML frontmatter!"
             )
 
-        safe_write_file(target_path, content, self.root_dir)
+        await asyncio.to_thread(safe_write_file, target_path, content, self.root_dir)
+        self._record_written_file(
+            target_path if os.path.isabs(target_path) else os.path.join(self.root_dir, target_path),
+            content,
+        )
 
         # Only append if not already in list (to avoid duplicates on retries)
-        if target_path not in state["generated_files"]:
+        if target_path not in state["generated_files_set"]:
             state["generated_files"].append(target_path)
+            state["generated_files_set"].add(target_path)
             
         # NOTE: Registration moved to Editor Node on approval
 
@@ -0,0 +1,85 @@
+"""
+Request coalescing for the async pipeline.
+Single items submitted by concurrent callers are buffered briefly and handed
+to one batch call, each caller receiving its own result.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List
+
+
+class Coalescer:
+    """
+    Buffers items from submit() and passes up to max_batch of them (or whatever
+    arrived within window seconds) to batch_fn, which returns one result per
+    item in the same order. If batch_fn raises, every caller in that batch gets
+    the exception.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch: int,
+        window: float,
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = None
+        self._drainer = None
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result from the next batch."""
+        loop = asyncio.get_running_loop()
+        # Queues, futures and the drainer belong to one event loop. A drainer left
+        # pending on another loop never sees this queue, so it is replaced too.
+        if self._drainer is None or self._drainer.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._drainer = None
+
+        future = loop.create_future()
+        self._queue.put_nowait((item, future))
+
+        # The drainer exits once the queue is empty (or is cancelled), so restart it on demand
+        if self._drainer is None or self._drainer.done():
+            self._drainer = loop.create_task(self._drain(self._queue))
+        return await future
+
+    async def _drain(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while not queue.empty():
+                batch = [queue.get_nowait()]
+                deadline = loop.time() + self.window
+                while len(batch) < self.max_batch:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+                try:
+                    results = list(await self.batch_fn([item for item, _ in batch]))
+                    if len(results) != len(batch):
+                        raise ValueError(
+                            f"Batch returned {len(results)} results for {len(batch)} items"
+                        )
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for (_, future), result in zip(batch, results):
+                        if not future.done():
+                            future.set_result(result)
+                batch = []
+        except asyncio.CancelledError:
+            # Don't leave callers waiting on a drainer that is gone
+            for _, future in batch:
+                future.cancel()
+            while not queue.empty():
+                queue.get_nowait()[1].cancel()
+            raise
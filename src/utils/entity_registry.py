@@ -5,34 +5,173 @@ their relationships (links), and their completion status.
 """
 
 import os
-import json
-import re
+import atexit
+import orjson
+from dataclasses import dataclass, field, fields
 from json.decoder import JSONDecodeError
-from typing import List, Dict, Any
+from pathlib import Path
+from typing import List, Dict, Any, Optional
 from datetime import datetime
+from src.utils.lifecycle import flush_at_exit
 
 REGISTRY_PATH = "checkpoints/entity_registry.json"
 
+# Buffered registrations are written to disk after this many updates
+FLUSH_EVERY = 10
+# Saves touching fewer than this fraction of entities are appended to the journal
+JOURNAL_MAX_FRACTION = 0.1
+# Journal records replayed at most before the next save rewrites the snapshot
+COMPACT_EVERY = 1000
+
+
+@dataclass(slots=True)
+class Entity:
+    """One registry entry. orjson serializes it as the same JSON object the dicts used."""
+
+    name: str
+    category: str
+    tier: int
+    status: str = "planned"
+    path: str = ""
+    word_count: int = 0
+    outbound_links: List[str] = field(default_factory=list)
+    inbound_links: List[str] = field(default_factory=list)
+    created_at: Optional[str] = None
+
+
+_ENTITY_FIELDS = frozenset(f.name for f in fields(Entity))
+
+
+def _entity_from_dict(entity: Dict[str, Any]) -> Entity:
+    return Entity(**{k: v for k, v in entity.items() if k in _ENTITY_FIELDS})
+
+
+def _iter_wikilinks(content: str):
+    """
+    Yield "Link Name" from [[Link Name]] and [[Link Name|Display Text]].
+    Uses str.find (C substring search) to jump between brackets. Links may not
+    span lines or contain ']', and the name may not be empty.
+    """
+    pos = 0
+    while (start := content.find("[[", pos)) >= 0:
+        end = content.find("]]", start + 2)
+        if end < 0:
+            return
+        inner = content[start + 2 : end]
+        name = inner.partition("|")[0]
+        if name and "]" not in inner and "\n" not in inner:
+            yield name
+            pos = end + 2
+        else:
+            pos = start + 1
+
 
 class EntityRegistry:
-    def __init__(self, root_dir: str):
+    def __init__(self, root_dir: str, autosave: bool = True):
+        """
+        autosave writes after every register_entity/update_content_stats call.
+        Updates made inside a `with registry:` block are written once on exit.
+        """
         self.root_dir = root_dir
         self.registry_path = os.path.join(root_dir, REGISTRY_PATH)
+        # JSON-lines log of entities changed since the last full snapshot
+        self.journal_path = self.registry_path + ".jnl"
+        self._journal_seq = 0
+        self._journal_lines = 0
+        self._changed: set = set()  # entity names to persist on the next save()
+        self._now_iso = None
         self.data = self._load_registry()
+        # target -> entities linking to it; written back to "inbound_links" on save().
+        # Rebuilt from outbound links too, so links to entities registered later survive reloads.
+        self._inbound: Dict[str, set] = {
+            name: set(entity.inbound_links)
+            for name, entity in self.data["entities"].items()
+        }
+        for name, entity in self.data["entities"].items():
+            for target in entity.outbound_links:
+                self._inbound.setdefault(target, set()).add(name)
+        # Names with status "planned"; a dict keeps them in registration order
+        self._planned: Dict[str, None] = {
+            name: None
+            for name, entity in self.data["entities"].items()
+            if entity.status == "planned"
+        }
+        self.autosave = autosave
+        self._pending = 0  # buffered registrations not yet on disk
+        self._batch_depth = 0
+        self._exit_hook = flush_at_exit(self)
+        # Loading a new registry reads now_iso; don't carry that time into later updates
+        self._now_iso = None
+
+    @property
+    def now_iso(self) -> str:
+        """Timestamp shared by every update until the next save()."""
+        if self._now_iso is None:
+            self._now_iso = datetime.now().isoformat()
+        return self._now_iso
+
+    def __enter__(self):
+        if not self._batch_depth:
+            # Each outermost batch gets its own timestamp
+            self._now_iso = None
+        self._batch_depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._batch_depth -= 1
+        if not self._batch_depth:
+            self.flush()
+        return False
+
+    def _mark_dirty(self):
+        self._pending += 1
+        if self.autosave and not self._batch_depth:
+            self.save()
 
     def _load_registry(self) -> Dict[str, Any]:
-        """Load registry from JSON or create new if not exists."""
-        if os.path.exists(self.registry_path):
-            try:
-                with open(self.registry_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except (IOError, OSError, JSONDecodeError) as e:
-                print(f"   ⚠️  Error loading registry: {e}. Creating new.")
+        """Load the registry snapshot, replay the journal over it, or create new."""
+        data = self._load_snapshot()
+        self._journal_seq = data["metadata"].get("journal_seq", 0)
+        try:
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = orjson.loads(line)
+                    except JSONDecodeError:
+                        break  # torn final line from an interrupted append
+                    # Records already folded into the snapshot are skipped
+                    if record["seq"] <= self._journal_seq:
+                        continue
+                    data["entities"][record["name"]] = _entity_from_dict(record["entity"])
+                    data["metadata"]["last_updated"] = record["last_updated"]
+                    self._journal_seq = record["seq"]
+                    self._journal_lines += 1
+        except FileNotFoundError:
+            pass
+        except (IOError, OSError, KeyError, TypeError) as e:
+            print(f"   ⚠️  Error replaying registry journal: {e}.")
+        # Replayed records may add entities the snapshot didn't count
+        data["metadata"]["total_entities"] = len(data["entities"])
+        return data
+
+    def _load_snapshot(self) -> Dict[str, Any]:
+        try:
+            # orjson parses the UTF-8 bytes directly, without decoding to str first
+            data = orjson.loads(Path(self.registry_path).read_bytes())
+            data["entities"] = {
+                name: _entity_from_dict(entity)
+                for name, entity in data["entities"].items()
+            }
+            return data
+        except FileNotFoundError:
+            pass
+        except (IOError, OSError, JSONDecodeError, KeyError, TypeError) as e:
+            print(f"   ⚠️  Error loading registry: {e}. Creating new.")
 
         return {
             "metadata": {
-                "created_at": datetime.now().isoformat(),
-                "last_updated": datetime.now().isoformat(),
+                "created_at": self.now_iso,
+                "last_updated": self.now_iso,
                 "total_entities": 0,
             },
             "entities": {},
@@ -40,13 +179,75 @@ class EntityRegistry:
         }
 
     def save(self):
-        """Save registry to JSON."""
-        self.data["metadata"]["last_updated"] = datetime.now().isoformat()
-        self.data["metadata"]["total_entities"] = len(self.data["entities"])
+        """
+        Save registry changes. Small change sets are appended to the journal;
+        large ones, or a journal past COMPACT_EVERY records, rewrite the snapshot.
+        """
+        entities = self.data["entities"]
+        for name in self._changed:
+            if name in entities and name in self._inbound:
+                entities[name].inbound_links = sorted(self._inbound[name])
+        self.data["metadata"]["last_updated"] = self.now_iso
+        self.data["metadata"]["total_entities"] = len(entities)
+
+        if (
+            self._changed
+            and len(self._changed) < len(entities) * JOURNAL_MAX_FRACTION
+            and self._journal_lines + len(self._changed) <= COMPACT_EVERY
+            and os.path.exists(self.registry_path)
+        ):
+            self._append_journal()
+        else:
+            self._write_snapshot()
+        self._changed.clear()
+        self._pending = 0
+        self._now_iso = None
+
+    def _append_journal(self):
+        records = []
+        for name in self._changed:
+            if name in self.data["entities"]:
+                self._journal_seq += 1
+                records.append(
+                    orjson.dumps(
+                        {
+                            "seq": self._journal_seq,
+                            "name": name,
+                            "last_updated": self.now_iso,
+                            "entity": self.data["entities"][name],
+                        }
+                    )
+                )
+        with open(self.journal_path, "ab") as f:
+            f.write(b"\n".join(records) + b"\n")
+        self._journal_lines += len(records)
 
+    def _write_snapshot(self):
+        # The snapshot records the last journal seq it contains, so stale journal
+        # lines left by a crash before the journal is removed are skipped on load
+        self.data["metadata"]["journal_seq"] = self._journal_seq
         os.makedirs(os.path.dirname(self.registry_path), exist_ok=True)
-        with open(self.registry_path, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, indent=2)
+        # Write to a temp file and rename over the old one so a crash mid-write
+        # never leaves a truncated registry behind.
+        tmp_path = self.registry_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(self.data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_path, self.registry_path)
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        self._journal_lines = 0
+
+    def flush(self):
+        """Write buffered registrations to disk."""
+        if self._pending:
+            self.save()
+
+    def close(self):
+        """Write buffered registrations and drop the exit-time flush."""
+        self.flush()
+        atexit.unregister(self._exit_hook)
 
     def register_entity(
         self,
@@ -57,74 +258,104 @@ class EntityRegistry:
         path: str = "",
     ):
         """Register an entity or update its status."""
-        if name not in self.data["entities"]:
-            self.data["entities"][name] = {
-                "name": name,
-                "category": category,
-                "tier": tier,
-                "status": status,
-                "path": path,
-                "word_count": 0,
-                "outbound_links": [],
-                "inbound_links": [],
-                "created_at": datetime.now().isoformat()
-                if status == "complete"
-                else None,
-            }
+        self._apply_entity(name, category, tier, status, path)
+        self._mark_dirty()
+
+    def register_entity_buffered(
+        self,
+        name: str,
+        category: str,
+        tier: int,
+        status: str = "planned",
+        path: str = "",
+    ):
+        """
+        Like register_entity, but the update is only kept in memory until
+        flush() or until FLUSH_EVERY updates have accumulated.
+        """
+        # Buffered updates happen at different times; don't reuse the batch timestamp
+        self._now_iso = None
+        self._apply_entity(name, category, tier, status, path)
+        self._pending += 1
+        if self._pending >= FLUSH_EVERY:
+            self.save()
+
+    def register_bulk(self, entities: List[Dict[str, Any]]):
+        """Register many entities (register_entity keyword dicts) with a single save."""
+        with self:
+            for entity in entities:
+                self._apply_entity(**entity)
+            self._pending += len(entities)
+
+    def _apply_entity(
+        self,
+        name: str,
+        category: str,
+        tier: int,
+        status: str = "planned",
+        path: str = "",
+    ):
+        self._changed.add(name)
+        entity = self.data["entities"].get(name)
+        if entity is None:
+            self.data["entities"][name] = Entity(
+                name=name,
+                category=category,
+                tier=tier,
+                status=status,
+                path=path,
+                created_at=self.now_iso if status == "complete" else None,
+            )
         else:
             # Update existing
-            self.data["entities"][name]["status"] = status
+            entity.status = status
             if path:
-                self.data["entities"][name]["path"] = path
+                entity.path = path
             if tier:
-                self.data["entities"][name]["tier"] = tier
+                entity.tier = tier
             if category:
-                self.data["entities"][name]["category"] = category
-            if status == "complete" and not self.data["entities"][name].get(
-                "created_at"
-            ):
-                self.data["entities"][name]["created_at"] = datetime.now().isoformat()
+                entity.category = category
+            if status == "complete" and not entity.created_at:
+                entity.created_at = self.now_iso
 
-        self.save()
+        if status == "planned":
+            self._planned.setdefault(name)
+        else:
+            self._planned.pop(name, None)
 
     def update_content_stats(self, name: str, content: str):
         """Update word count and extract wikilinks."""
-        if name not in self.data["entities"]:
+        entity = self.data["entities"].get(name)
+        if entity is None:
             return
 
+        self._changed.add(name)
+
         # Word count
-        word_count = len(content.split())
-        self.data["entities"][name]["word_count"] = word_count
+        entity.word_count = len(content.split())
 
         # Extract wikilinks: [[Link Name]] or [[Link Name|Display Text]]
-        # Regex handles both cases, capturing "Link Name"
-        links = re.findall(r"\[\[(.*?)(?:\|.*?)?\]\]", content)
-        unique_links = list(set(links))
-
-        # Update outbound links
-        self.data["entities"][name]["outbound_links"] = unique_links
-
-        # Update inbound links for targets
-        for target in unique_links:
-            # If target exists, add inbound link
-            if target in self.data["entities"]:
-                if name not in self.data["entities"][target]["inbound_links"]:
-                    self.data["entities"][target]["inbound_links"].append(name)
-            else:
-                # Optional: Register "stub" or "missing" entity?
-                # For now, we just track it if it eventually gets created
-                pass
-
-        self.save()
+        new_links = set(_iter_wikilinks(content))
+        old_links = set(entity.outbound_links)
+
+        # Stored sorted so the registry JSON is stable across runs
+        entity.outbound_links = sorted(new_links)
+
+        # Update inbound links for targets by delta. Targets that don't exist yet
+        # are tracked too and pick up their inbound links once registered.
+        for target in new_links - old_links:
+            self._inbound.setdefault(target, set()).add(name)
+        for target in old_links - new_links:
+            self._inbound.get(target, set()).discard(name)
+        self._changed.update(new_links ^ old_links)
+
+        self._mark_dirty()
 
     def get_planned_queue(self) -> List[str]:
         """Get list of entities planned but not complete."""
-        return [
-            name
-            for name, data in self.data["entities"].items()
-            if data["status"] == "planned"
-        ]
+        return list(self._planned)
 
     def is_complete(self, name: str) -> bool:
         """Check if entity is marked complete."""
-        return self.data["entities"].get(name, {}).get("status") == "complete"
+        entity = self.data["entities"].get(name)
+        return entity is not None and entity.status == "complete"
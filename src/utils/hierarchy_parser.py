@@ -1,6 +1,90 @@
 import os
+import mmap
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict
 
+_TIER_HEADER = b"## **Tier "
+_TIERS = {b"1": 1, b"2": 2, b"3": 3, b"4": 4, b"5": 5}
+
+# Hierarchy files larger than this are parsed in chunks across processes.
+# Unpickling the workers' entities costs the parent about half a serial parse
+# and the pool ~25ms to start, so even 4 workers only break even around 5MB.
+PARALLEL_PARSE_THRESHOLD = 8 * 1024 * 1024
+
+
+def _iter_lines(mm: mmap.mmap, start: int, end: int):
+    """Stripped, non-empty lines starting in [start, end) of the mapped file."""
+    mm.seek(start)
+    while mm.tell() < end:
+        line = mm.readline().strip()
+        if line:
+            yield line
+
+
+def _parse_lines(lines, current_tier, current_category):
+    """
+    Parse hierarchy lines (bytes) into entity dicts.
+    Returns (entities, tier, category) as of the last line. Entities seen before
+    any header get the tier/category passed in, which may be None for a chunk
+    whose context is only known after the previous chunk is parsed.
+    """
+    parsed_data = []
+
+    # Lines are matched as bytes; only category and entity lines are decoded
+    for line in lines:
+        # Detect Tier Headers; unknown tier digits leave the tier unchanged
+        if line.startswith(_TIER_HEADER):
+            current_tier = _TIERS.get(
+                line[len(_TIER_HEADER) : len(_TIER_HEADER) + 1], current_tier
+            )
+        elif line.startswith(b"## **Meta"):
+            current_tier = 99  # Special tier for meta
+
+        # Detect Category Headers (Bold text)
+        elif (
+            line.startswith(b"**")
+            and line.endswith(b"**")
+            and not line.startswith(b"##")
+        ):
+            current_category = line.decode("utf-8").strip("*")
+
+        # Detect List Items (Entities)
+        elif line.startswith((b"- ", b"* ")):
+            # Normalize Name
+            raw_name = line.decode("utf-8").lstrip("-* ").strip()
+
+            # Handle "Article: Name" or "Event 1.1: Name"
+            # We want the core name for the entity, but maybe the full string is better for the file title?
+            # The user's file has "Article: The GM's Truth". The file on disk is "Article- The GM's Truth.md".
+            # For the QUEUE, we want the "Concept Name".
+            # But if we queue "The GM's Truth", the agent might write "The GM's Truth.md".
+            # Let's use the full raw name (normalized) as the entity name for now.
+
+            # Remove "Article: ", "Event X.X: ", "Faction Dossier: " prefixes?
+            # Actually, the user's previous files HAVE these prefixes.
+            # So we should keep them to match existing files.
+
+            # Just replace colons with hyphens to match file system
+            safe_name = raw_name.replace(": ", "- ").replace(":", "-")
+
+            parsed_data.append(
+                {
+                    "name": safe_name,
+                    "tier": current_tier,
+                    "category": current_category,
+                    "raw_line": raw_name,
+                }
+            )
+
+    return parsed_data, current_tier, current_category
+
+
+def _parse_range(file_path: str, start: int, end: int):
+    """Worker: parse one chunk without knowing the tier/category it starts in."""
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _parse_lines(_iter_lines(mm, start, end), None, None)
+
 
 class HierarchyParser:
     def __init__(self, file_path: str):
@@ -13,72 +97,63 @@ class HierarchyParser:
             print(f"⚠️ Hierarchy file not found: {self.file_path}")
             return []
 
-        with open(self.file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
         current_tier = 5  # Default to lowest priority
         current_category = "Unsorted"
 
-        parsed_data = []
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Detect Tier Headers
-            if line.startswith("## **Tier 1"):
-                current_tier = 1
-            elif line.startswith("## **Tier 2"):
-                current_tier = 2
-            elif line.startswith("## **Tier 3"):
-                current_tier = 3
-            elif line.startswith("## **Tier 4"):
-                current_tier = 4
-            elif line.startswith("## **Tier 5"):
-                current_tier = 5
-            elif line.startswith("## **Meta"):
-                current_tier = 99  # Special tier for meta
-
-            # Detect Category Headers (Bold text)
-            elif (
-                line.startswith("**")
-                and line.endswith("**")
-                and not line.startswith("##")
-            ):
-                current_category = line.strip("*")
-
-            # Detect List Items (Entities)
-            elif line.startswith("- ") or line.startswith("* "):
-                # Normalize Name
-                raw_name = line.lstrip("-* ").strip()
-
-                # Handle "Article: Name" or "Event 1.1: Name"
-                # We want the core name for the entity, but maybe the full string is better for the file title?
-                # The user's file has "Article: The GM's Truth". The file on disk is "Article- The GM's Truth.md".
-                # For the QUEUE, we want the "Concept Name".
-                # But if we queue "The GM's Truth", the agent might write "The GM's Truth.md".
-                # Let's use the full raw name (normalized) as the entity name for now.
-
-                # Remove "Article: ", "Event X.X: ", "Faction Dossier: " prefixes?
-                # Actually, the user's previous files HAVE these prefixes.
-                # So we should keep them to match existing files.
-
-                # Just replace colons with hyphens to match file system
-                safe_name = raw_name.replace(": ", "- ").replace(":", "-")
-
-                parsed_data.append(
-                    {
-                        "name": safe_name,
-                        "tier": current_tier,
-                        "category": current_category,
-                        "raw_line": raw_name,
-                    }
-                )
+        with open(self.file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                parsed_data = []  # mmap can't map an empty file
+            elif size > PARALLEL_PARSE_THRESHOLD and (os.cpu_count() or 1) > 1:
+                parsed_data = self._parse_parallel(f, size, current_tier, current_category)
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    parsed_data, _, _ = _parse_lines(
+                        _iter_lines(mm, 0, size), current_tier, current_category
+                    )
 
         self.entities = parsed_data
         return parsed_data
 
+    def _parse_parallel(self, f, size: int, current_tier, current_category) -> List[Dict]:
+        """
+        Split the file at line boundaries and parse the chunks in worker processes.
+        Each chunk reports the tier/category it ends in; entities a chunk saw
+        before its first header inherit them from the chunks before it.
+        """
+        workers = os.cpu_count() or 1
+        bounds = [0]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for i in range(1, workers):
+                newline = mm.find(b"\n", max(size * i // workers, bounds[-1]))
+                if newline < 0:
+                    break
+                if newline + 1 > bounds[-1]:
+                    bounds.append(newline + 1)
+        bounds.append(size)
+
+        with ProcessPoolExecutor(max_workers=len(bounds) - 1) as pool:
+            chunks = pool.map(
+                _parse_range,
+                [self.file_path] * (len(bounds) - 1),
+                bounds[:-1],
+                bounds[1:],
+            )
+
+            parsed_data = []
+            for entities, end_tier, end_category in chunks:
+                for entity in entities:
+                    if entity["tier"] is None:
+                        entity["tier"] = current_tier
+                    if entity["category"] is None:
+                        entity["category"] = current_category
+                parsed_data.extend(entities)
+                if end_tier is not None:
+                    current_tier = end_tier
+                if end_category is not None:
+                    current_category = end_category
+        return parsed_data
+
     def get_tier_map(self) -> Dict[str, int]:
         """Returns a dictionary mapping entity names to their tier."""
         return {item["name"]: item["tier"] for item in self.entities}
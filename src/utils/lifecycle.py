@@ -0,0 +1,26 @@
+"""
+Exit-time persistence for objects that buffer writes (registry, priority queue).
+"""
+
+import atexit
+import weakref
+from typing import Callable
+
+
+def flush_at_exit(obj) -> Callable[[], None]:
+    """
+    Call obj.flush() at interpreter exit without keeping obj alive until then.
+    The hook is dropped once obj is garbage collected. Returns the hook so
+    close() can atexit.unregister it.
+    """
+    ref = weakref.ref(obj)
+
+    def hook():
+        live = ref()
+        if live is not None:
+            live.flush()
+
+    atexit.register(hook)
+    # Only unregister on collection; at exit the hook itself must still run
+    weakref.finalize(obj, atexit.unregister, hook).atexit = False
+    return hook
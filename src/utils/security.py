@@ -1,10 +1,40 @@
 import os
 import logging
+from functools import lru_cache
 
 class SecurityError(Exception):
     """Raised when a security violation is detected."""
     pass
 
+class PathValidator:
+    """
+    Validates paths against one root directory. The root is resolved once, so
+    each check is a realpath of the target plus a prefix comparison.
+    """
+    __slots__ = ("root", "root_sep")
+
+    def __init__(self, root_dir: str):
+        # Resolve symlinks as well, so a link inside the root can't point outside it
+        self.root = os.path.realpath(root_dir)
+        # The separator stops "/vault2" from matching "/vault"
+        self.root_sep = self.root.rstrip(os.sep) + os.sep
+
+    def validate(self, path: str) -> str:
+        """Return the absolute path, with symlinks resolved, or raise SecurityError."""
+        abs_path = os.path.realpath(os.path.join(self.root, path))
+
+        # Inside (or is) the root
+        if abs_path != self.root and not abs_path.startswith(self.root_sep):
+            logging.warning(f"Security Alert: Path traversal attempt detected. {path} is outside {self.root}")
+            raise SecurityError(f"Access denied: Path '{path}' is outside the allowed root directory.")
+
+        return abs_path
+
+@lru_cache(maxsize=64)
+def _validator(abs_root: str) -> PathValidator:
+    """One validator per vault root; a run writes thousands of files under one root."""
+    return PathValidator(abs_root)
+
 def validate_path(path: str, root_dir: str) -> str:
     """
     Validates that a path is safe and within the root directory.
@@ -15,29 +45,12 @@ def validate_path(path: str, root_dir: str) -> str:
         root_dir: The allowed root directory.
         
     Returns:
-        The absolute path if valid.
+        The absolute path, with symlinks resolved, if valid.
         
     Raises:
         SecurityError: If the path is outside the root directory.
     """
-    # Resolve absolute paths
-    abs_root = os.path.abspath(root_dir)
-    abs_path = os.path.abspath(os.path.join(abs_root, path))
-    
-    # Check if path is within root
-    # os.path.commonpath returns the longest common sub-path
-    # If the common path is the root, then the file is inside (or is) the root
-    try:
-        common = os.path.commonpath([abs_root, abs_path])
-    except ValueError:
-        # Can happen on Windows if drives are different, or other edge cases
-        raise SecurityError(f"Path '{path}' is on a different drive/location than root '{root_dir}'")
-
-    if common != abs_root:
-        logging.warning(f"Security Alert: Path traversal attempt detected. {path} is outside {root_dir}")
-        raise SecurityError(f"Access denied: Path '{path}' is outside the allowed root directory.")
-        
-    return abs_path
+    return _validator(os.path.abspath(root_dir)).validate(path)
 
 def safe_write_file(path: str, content: str, root_dir: str):
     """
@@ -6,6 +6,7 @@ Extracts key points and entity mentions from source files to create a lightweigh
 import os
 import json
 import asyncio
+import orjson
 from pathlib import Path
 from typing import Dict
 from dotenv import load_dotenv
@@ -14,6 +15,57 @@ from src.core.cognitive_engine import CognitiveEngine
 # Load environment variables
 load_dotenv()
 
+_JSON_DECODER = json.JSONDecoder()
+
+# Source files summarized concurrently
+SUMMARY_CONCURRENCY = 8
+# Characters of each source file sent to the LLM
+SUMMARY_HEAD_CHARS = 8000
+# Summary instructions placed before the document text
+_SUMMARY_PROMPT_HEAD = """
+        Analyze this worldbuilding document and extract:
+        
+        1. **Key Points** (3-5 core facts that define this concept)
+        2. **Entity Names** (A simple list of names of places, people, factions, events, concepts)
+        3. **Category** (Axiom, Faction, Location, NPC, Event, Item, Lineage, etc.)
+        
+        Return the result as a single, flat JSON object. Do not include nested fields or importance levels.
+        
+        JSON STRUCTURE:
+        {
+          "key_points": ["point 1", "point 2", ...],
+          "entity_names": ["Entity 1", "Entity 2", ...],
+          "category": "Axiom"
+        }
+        
+        DOCUMENT:
+        """
+_SUMMARY_PROMPT_TAIL = "\n        "
+# Characters per read when counting the rest of a file
+READ_CHUNK_CHARS = 64 * 1024
+
+
+def _read_source(path: Path) -> tuple[str, int, int]:
+    """
+    Read the head of a source file for the prompt, streaming the remainder in
+    bounded chunks only to count characters and words.
+    Returns: (head, char_count, word_count)
+    """
+    head = None
+    chars = words = 0
+    prev_in_word = False
+    with open(path, "r", encoding="utf-8") as f:
+        while chunk := f.read(READ_CHUNK_CHARS):
+            if head is None:
+                head = chunk[:SUMMARY_HEAD_CHARS]
+            chars += len(chunk)
+            words += len(chunk.split())
+            # A word cut in half by the chunk boundary was counted twice
+            if prev_in_word and not chunk[0].isspace():
+                words -= 1
+            prev_in_word = not chunk[-1].isspace()
+    return head or "", chars, words
+
 
 class SummaryGenerator:
     def __init__(self, source_dir: str = "Source FIles"):
@@ -25,65 +77,54 @@ class SummaryGenerator:
             "metadata": {"version": "1.0", "total_files": 0, "last_updated": None},
         }
 
-    def _extract_json_from_response(self, response: str) -> str:
+    def _extract_json_from_response(self, response: str) -> Dict:
         """
-        Extract the first valid JSON object from a response that may contain extra text.
+        Parse the first JSON object from a response that may contain extra text.
         This handles cases where the LLM adds content after the JSON.
         """
-        # Find the first '{' and the last '}'
-        start_idx = response.find('{')
+        # JSON mode usually returns a bare object; parse it in one go
+        try:
+            result = orjson.loads(response)
+            if isinstance(result, dict):
+                return result
+        except orjson.JSONDecodeError:
+            pass
+
+        start_idx = response.find("{")
         if start_idx == -1:
             raise ValueError("No JSON object found in response")
-        
-        # Find the matching closing brace
-        brace_count = 0
-        end_idx = -1
-        for i in range(start_idx, len(response)):
-            if response[i] == '{':
-                brace_count += 1
-            elif response[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    end_idx = i + 1
-                    break
-        
-        if end_idx == -1:
-            raise ValueError("No matching closing brace found for JSON object")
-        
-        return response[start_idx:end_idx]
 
-    async def extract_summary(self, file_path: str, content: str) -> Dict:
+        # raw_decode stops at the end of the first object and ignores what follows
+        result, _ = _JSON_DECODER.raw_decode(response, start_idx)
+        return result
+
+    async def extract_summary(
+        self,
+        file_path: str,
+        content: str,
+        file_size: int = None,
+        word_count: int = None,
+    ) -> Dict:
         """
         Extract key points and entity mentions from a single file.
         (Using simplified structure for reliability)
+        content only needs the first SUMMARY_HEAD_CHARS characters when
+        file_size and word_count for the whole file are passed in.
         """
-        prompt = f"""
-        Analyze this worldbuilding document and extract:
-        
-        1. **Key Points** (3-5 core facts that define this concept)
-        2. **Entity Names** (A simple list of names of places, people, factions, events, concepts)
-        3. **Category** (Axiom, Faction, Location, NPC, Event, Item, Lineage, etc.)
-        
-        Return the result as a single, flat JSON object. Do not include nested fields or importance levels.
-        
-        JSON STRUCTURE:
-        {{
-          "key_points": ["point 1", "point 2", ...],
-          "entity_names": ["Entity 1", "Entity 2", ...],
-          "category": "Axiom"
-        }}
-        
-        DOCUMENT:
-        {content[:8000]}
-        """
+        if file_size is None:
+            file_size = len(content)
+        if word_count is None:
+            word_count = len(content.split())
+
+        # Static instructions are a module constant; only the document is appended
+        prompt = _SUMMARY_PROMPT_HEAD + content[:SUMMARY_HEAD_CHARS] + _SUMMARY_PROMPT_TAIL
 
         try:
             response = await self.engine.generate_async(
                 prompt, response_mime_type="application/json"
             )
-            # Extract only the JSON portion from the response
-            json_str = self._extract_json_from_response(response)
-            llm_summary = json.loads(json_str)
+            # Parse only the JSON portion of the response
+            llm_summary = self._extract_json_from_response(response)
 
             # --- SYNTHESIZE FOR CACHE STRUCTURE ---
             # The LLM now returns 'entity_names' (list), but the cache expects 'entities' (dict).
@@ -99,24 +140,24 @@ class SummaryGenerator:
                 "key_points": llm_summary.get("key_points", []),
                 "entities": entities_dict,
                 "category": llm_summary.get("category", "Unknown"),
-                "file_size": len(content),
-                "word_count": len(content.split()),
+                "file_size": file_size,
+                "word_count": word_count,
             }
 
             return final_summary
         except Exception as e:
             # Fallback logic is used if LLM output fails to parse (due to malformed JSON)
             print(f"   ⚠️ Error extracting summary: {e}")
-            return self._create_fallback_summary(content)
+            return self._create_fallback_summary(file_size, word_count)
 
-    def _create_fallback_summary(self, content: str) -> Dict:
+    def _create_fallback_summary(self, file_size: int, word_count: int) -> Dict:
         """Create a basic summary if LLM extraction fails."""
         return {
             "key_points": ["Content available but summary extraction failed"],
             "entities": {},
             "category": "Unknown",
-            "file_size": len(content),
-            "word_count": len(content.split()),
+            "file_size": file_size,
+            "word_count": word_count,
         }
 
     async def build_source_cache(self, progress_callback=None) -> Dict:
@@ -136,25 +177,37 @@ class SummaryGenerator:
 
         print(f"📚 Found {total_files} source files")
 
-        for idx, file_path in enumerate(md_files, 1):
-            relative_path = file_path.relative_to(source_path)
+        sem = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+        done = 0
 
+        async def process_one(file_path: Path):
+            nonlocal done
+            relative_path = file_path.relative_to(source_path)
+            async with sem:
+                try:
+                    head, file_size, word_count = await asyncio.to_thread(
+                        _read_source, file_path
+                    )
+                    summary = await self.extract_summary(
+                        str(file_path), head, file_size, word_count
+                    )
+                except Exception as e:
+                    print(f"   ❌ Error processing {relative_path}: {e}")
+                    summary = None
+
+            done += 1
             if progress_callback:
-                progress_callback(idx, total_files, str(relative_path))
+                progress_callback(done, total_files, str(relative_path))
             else:
-                print(f"   [{idx}/{total_files}] Processing: {relative_path}")
-
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                summary = await self.extract_summary(str(file_path), content)
+                print(f"   [{done}/{total_files}] Processed: {relative_path}")
+            return relative_path, summary
 
+        # Each file is an independent LLM round-trip; results are stored in file order
+        results = await asyncio.gather(*(process_one(p) for p in md_files))
+        for relative_path, summary in results:
+            if summary is not None:
                 self.cache["source"][str(relative_path)] = summary
 
-            except Exception as e:
-                print(f"   ❌ Error processing {relative_path}: {e}")
-
         self.cache["metadata"]["total_files"] = len(self.cache["source"])
 
         import datetime
@@ -165,8 +218,8 @@ class SummaryGenerator:
 
     def save_cache(self, output_path: str = "world_primer_cache.json"):
         """Save cache to JSON file."""
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(self.cache, f, indent=2)
+        with open(output_path, "wb") as f:
+            f.write(orjson.dumps(self.cache, option=orjson.OPT_INDENT_2))
         print(f"💾 Cache saved to: {output_path}")
 
     @staticmethod
@@ -179,8 +232,8 @@ class SummaryGenerator:
                 "metadata": {"version": "1.0", "total_files": 0},
             }
 
-        with open(cache_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(cache_path, "rb") as f:
+            return orjson.loads(f.read())
 
 
 async def main():
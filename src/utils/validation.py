@@ -3,6 +3,14 @@ Utility functions for content validation and cleanup.
 """
 
 import re
+from itertools import islice
+
+_FENCE_OPEN = re.compile(r"^```(?:markdown|yaml|json)?\s*\n", re.MULTILINE)
+_FENCE_CLOSE = re.compile(r"\n```\s*$", re.MULTILINE)
+_SECRET_CALLOUT = re.compile(re.escape("> [!secret]"), re.IGNORECASE)
+_WORD = re.compile(r"\S+")
+# Generated articles shorter than this are flagged
+MIN_WORD_COUNT = 300
 
 
 def strip_code_fences(content: str) -> str:
@@ -10,15 +18,8 @@ def strip_code_fences(content: str) -> str:
     Remove code fences from AI-generated content.
     Handles ```markdown, ```yaml, and ``` fences.
     """
-    # Remove opening fence (```markdown, ```yaml, or just ```)
-    content = re.sub(
-        r"^```(?:markdown|yaml|json)?\s*\n", "", content, flags=re.MULTILINE
-    )
-
-    # Remove closing fence (```)
-    content = re.sub(r"\n```\s*$", "", content, flags=re.MULTILINE)
-
-    return content.strip()
+    # Remove opening fence (```markdown, ```yaml, or just ```), then closing fence (```)
+    return _FENCE_CLOSE.sub("", _FENCE_OPEN.sub("", content)).strip()
 
 
 def validate_markdown_format(content: str, entity_name: str) -> list:
@@ -35,16 +36,17 @@ def validate_markdown_format(content: str, entity_name: str) -> list:
         )
 
     # Check for GM's Truth section
-    if "> [!secret]" not in content.lower():
+    # Case-insensitive search without lowercasing a copy of the whole article
+    if not _SECRET_CALLOUT.search(content):
         warnings.append(f"⚠️  {entity_name}: Missing GM's Truth section (> [!secret])")
 
     # Check for tags in frontmatter
-    if "tags:" not in content[:500]:  # Check first 500 chars
+    if content.find("tags:", 0, 500) < 0:  # Check first 500 chars
         warnings.append(f"⚠️  {entity_name}: Missing 'tags:' in YAML frontmatter")
 
-    # Check minimum word count (rough estimate)
-    word_count = len(content.split())
-    if word_count < 300:
+    # Check minimum word count; counting stops once the minimum is reached
+    word_count = sum(1 for _ in islice(_WORD.finditer(content), MIN_WORD_COUNT))
+    if word_count < MIN_WORD_COUNT:
         warnings.append(f"⚠️  {entity_name}: Only {word_count} words (expected 500+)")
 
     return warnings
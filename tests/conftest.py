@@ -13,6 +13,12 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 
+@pytest.fixture(scope="module")
+def cwd():
+    """Working directory, looked up once per test module."""
+    return os.getcwd()
+
+
 @pytest.fixture
 def mock_vault(tmp_path):
     """
@@ -107,9 +113,22 @@ Mock content generated by the test harness.
             response.usage_metadata = None
             return response
 
+        async def fake_embed(model, contents):
+            """Fixed-size zero vectors, one per text."""
+            response = MagicMock()
+            response.embeddings = [MagicMock(values=[0.0] * 768) for _ in contents]
+            return response
+
         # Mock both sync and async methods
         mock_instance.aio.models.generate_content = AsyncMock(side_effect=smart_parrot)
+        mock_instance.aio.models.embed_content = AsyncMock(side_effect=fake_embed)
         mock_instance.models.generate_content.side_effect = smart_parrot
+        # No context caching in tests: callers fall back to plain system instructions
+        # and nothing is written to the on-disk cache registry
+        mock_instance.caches.create.side_effect = RuntimeError("context caching not mocked")
+        mock_instance.aio.caches.create = AsyncMock(
+            side_effect=RuntimeError("context caching not mocked")
+        )
 
         yield mock_instance
 
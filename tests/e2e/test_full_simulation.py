@@ -53,7 +53,7 @@ async def test_full_agent_simulation(mock_vault, mock_llm):
     nodes_executed = []
 
     # Run the agent
-    async for event in graph.app.astream(initial_state, config={"recursion_limit": 100}):
+    async for event in graph.astream(initial_state, config={"recursion_limit": 100}):
         for node, state in event.items():
             nodes_executed.append(node)
 
@@ -91,6 +91,8 @@ async def test_full_agent_simulation(mock_vault, mock_llm):
             elif node == "editor":
                 print(f"   - EDITOR: Reviewed content. Status: {state.get('critique_notes', 'Unknown')}")
 
+    await graph.aclose()
+
     print("\n" + "=" * 60)
     print("SIMULATION COMPLETE\n")
 
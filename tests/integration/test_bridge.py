@@ -47,12 +47,12 @@ async def test_obsidian_bridge(mock_vault):
     # We won't actually wait for filesystem events in a unit test to avoid flakiness,
     # but we can test the handler directly.
     
-    bridge.process_file(str(test_file))
+    await bridge.process_file(str(test_file))
     # Should log processing
     
     # Test file renaming on failure
     bridge.lint_content = MagicMock(return_value=["Error"])
-    bridge.process_file(str(test_file))
+    await bridge.process_file(str(test_file))
     
     # Check if file was renamed
     renamed_files = list(mock_vault.glob("_NEEDS_REVIEW_LINT_FAIL_*"))
@@ -32,6 +32,9 @@ async def test_supabase_integration(mock_vault):
             
             # Mock Engine Embeddings
             retriever.engine.embed_async = AsyncMock(return_value=[0.1] * 768)
+            retriever.engine.embed_batch_async = AsyncMock(
+                side_effect=lambda docs: [[0.1] * 768 for _ in docs]
+            )
             
             # 1. Test Indexing
             print("\nTesting Indexing...")
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from src.utils.coalescer import Coalescer
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_batches():
+    """Test that concurrent items are batched and each caller gets its own result."""
+    batches = []
+
+    async def upper(items):
+        batches.append(items)
+        return [item.upper() for item in items]
+
+    coalescer = Coalescer(upper, max_batch=3, window=0.01)
+    results = await asyncio.gather(*(coalescer.submit(c) for c in "abcde"))
+
+    assert results == ["A", "B", "C", "D", "E"]
+    assert batches == [["a", "b", "c"], ["d", "e"]]
+
+@pytest.mark.asyncio
+async def test_batch_errors_reach_every_caller():
+    """Test that a failing batch raises in every waiting caller and the next batch still runs."""
+    async def fail_on_bad(items):
+        if "bad" in items:
+            raise RuntimeError("batch failed")
+        return items
+
+    coalescer = Coalescer(fail_on_bad, max_batch=10, window=0.01)
+    results = await asyncio.gather(
+        coalescer.submit("bad"), coalescer.submit("ok"), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert await coalescer.submit("ok") == "ok"
+
+def test_submit_on_new_loop_while_old_drainer_is_pending():
+    """Test that a submit on a second loop isn't stuck behind a drainer left on the first."""
+    async def block_on_first(items):
+        if "first" in items:
+            await asyncio.Event().wait()
+        return items
+
+    coalescer = Coalescer(block_on_first, max_batch=10, window=0.01)
+    first_loop = asyncio.new_event_loop()
+    try:
+        first = first_loop.create_task(coalescer.submit("first"))
+        # Leave the first loop with its drainer blocked mid-batch
+        first_loop.run_until_complete(asyncio.sleep(0.05))
+
+        async def submit_second():
+            return await asyncio.wait_for(coalescer.submit("second"), 1)
+
+        assert asyncio.run(submit_second()) == "second"
+    finally:
+        pending = asyncio.all_tasks(first_loop)
+        for task in pending:
+            task.cancel()
+        first_loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        first_loop.close()
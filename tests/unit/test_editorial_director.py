@@ -0,0 +1,14 @@
+from src.core.editorial_director import EditorialDirector
+
+def test_padded_table_does_not_inflate_word_count():
+    """Test that padding in a markdown table isn't counted as words."""
+    rows = "\n".join(f"> | Field {i:<10}   |   Value {i:<20}   |" for i in range(40))
+    body = " ".join(["word"] * 500)
+    content = f"---\ntags: [test]\n---\n> [!infobox]\n{rows}\n\n{body}\n"
+
+    _, status, feedback = EditorialDirector().review_content(content, ("TIER 1", 1200, ""))
+
+    word_count = len(content.split())
+    assert word_count < 960
+    assert status == "warning"
+    assert f"Low density: {word_count} words (Target: 1200)" in feedback
@@ -0,0 +1,46 @@
+import os
+import shutil
+from src.utils.entity_registry import EntityRegistry
+
+def _registry_with_entities(root, count=50):
+    registry = EntityRegistry(str(root))
+    registry.register_bulk(
+        [{"name": f"Entity {i}", "category": "Lore", "tier": 3} for i in range(count)]
+    )
+    return registry
+
+def test_small_saves_are_journaled_and_replayed(tmp_path):
+    """Test that a small change is appended to the journal and survives a reload."""
+    registry = _registry_with_entities(tmp_path)
+    registry.register_entity("Entity 1", "Lore", 3, status="complete", path="a.md")
+    registry.update_content_stats("Entity 1", "See [[Entity 2]] and [[Later]].")
+
+    assert os.path.exists(registry.journal_path)
+
+    reloaded = EntityRegistry(str(tmp_path))
+    assert reloaded.is_complete("Entity 1")
+    assert reloaded.data["metadata"]["total_entities"] == 50
+    assert reloaded.data["entities"]["Entity 2"].inbound_links == ["Entity 1"]
+
+    # Links to entities registered later are picked up once they exist
+    reloaded.register_entity("Later", "Lore", 4)
+    replayed = EntityRegistry(str(tmp_path))
+    assert replayed.data["entities"]["Later"].inbound_links == ["Entity 1"]
+    assert replayed.data["metadata"]["total_entities"] == 51
+
+def test_snapshot_skips_stale_journal(tmp_path):
+    """Test that journal records already folded into a snapshot are not replayed."""
+    registry = _registry_with_entities(tmp_path)
+    registry.register_entity("Entity 1", "Lore", 4)
+    stale_journal = str(tmp_path / "stale.jnl")
+    shutil.copy(registry.journal_path, stale_journal)
+
+    # A large batch rewrites the snapshot and drops the journal
+    with registry:
+        for i in range(20):
+            registry.register_entity(f"Entity {i}", "Lore", 2)
+    assert not os.path.exists(registry.journal_path)
+
+    # Simulate a crash that left the old journal behind
+    shutil.copy(stale_journal, registry.journal_path)
+    assert EntityRegistry(str(tmp_path)).data["entities"]["Entity 1"].tier == 2